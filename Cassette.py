@@ -1,8 +1,13 @@
 import time
+import multiprocessing
+
+if __name__ == '__main__':
+    # Frozen builds start effect pool workers through this script, they leave here before the app imports below.
+    multiprocessing.freeze_support()
 
 def profile_imports_to_console():
     modules = [
-        "numpy", "pygame", "PyQt5", "loguru", "aubio", 
+        "numpy", "PyQt5", "loguru", "aubio", 
         "requests", "soundfile", "sounddevice", "OpenGL", 
         "mutagen", "av"
     ]
@@ -27,7 +32,8 @@ def profile_imports_to_console():
     print("="*40 + "\n")
 
 # Запуск анализатора
-profile_imports_to_console()
+if __name__ == '__main__':
+    profile_imports_to_console()
 
 
 
@@ -60,6 +66,8 @@ from System import UI
 from System import Utils
 from System import Styles
 from System import Player
+from System import SoundBank
+from System import Mixer
 end = time.perf_counter()
 
 logger.debug(f"System modules imported successfully. Time taken: {end - start:.2f} seconds")
@@ -438,6 +446,7 @@ class ApplicationWindow(QMainWindow):
         self.hide()
         
         if self.compositor_widget.content_widget.composition:
+            self.compositor_widget.content_widget.composition.flush_save()
             self.compositor_widget.content_widget.composition.syncer.exit_app()
 
         if Player.player.is_playing:
@@ -460,6 +469,7 @@ def main():
 
     prepare_default_settings(SettingsDict)
     load_settings()
+    SoundBank.bank.preload()
 
     if CurrentSettings.get("msaa"):
         fmt.setSamples(CurrentSettings["msaa"])
@@ -476,6 +486,8 @@ def main():
     start = time.perf_counter()
     app = QApplication(sys.argv)
     app.setStyle("Fusion")
+    # Runs after the exit effects, right before the event loop returns.
+    app.aboutToQuit.connect(Mixer.mixer.close)
     end = time.perf_counter()
     
     logger.debug(f"QApplication initialized. Time taken: {end - start:.2f} seconds")
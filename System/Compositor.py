@@ -1,5 +1,6 @@
 import time
 import copy
+import collections
 import traceback
 
 import numpy as np
@@ -12,6 +13,7 @@ from System import Player as Player
 from System import Styles
 from System import GlyphEffects
 from System import ProjectSaver
+from System import GlyphTable
 
 from System.Constants import *
 from loguru import logger
@@ -47,6 +49,10 @@ class KeyboardController(QObject):
         bind(Qt.CTRL + Qt.Key_V, self.glyph_controller.paste_glyphs)
         bind(Qt.CTRL + Qt.Key_X, self.glyph_controller.cut_glyphs)
         
+        bind(Qt.CTRL + Qt.Key_Z, self.glyph_controller.undo)
+        bind(Qt.CTRL + Qt.SHIFT + Qt.Key_Z, self.glyph_controller.redo)
+        bind(Qt.CTRL + Qt.Key_Y, self.glyph_controller.redo)
+        
         bind(Qt.Key_Delete, self.glyph_controller.delete_glyphs)
         bind(Qt.Key_Backspace, self.glyph_controller.delete_glyphs)
         
@@ -246,6 +252,39 @@ class GlyphController(QObject):
             self.composition.delete_bunch_of_glyphs(deleted_ids)
         
         self.elements_changed.emit()
+    
+    def undo(self):
+        if not self._drag_session:
+            self._apply_history_step(self.composition.undo())
+    
+    def redo(self):
+        if not self._drag_session:
+            self._apply_history_step(self.composition.redo())
+    
+    def _apply_history_step(self, step):
+        if step is None:
+            return
+        
+        items = {item.glyph_id: item for item in self.glyph_items}
+        
+        for glyph_id in step.before:
+            glyph = self.composition.get_glyph(glyph_id)
+            item = items.get(glyph_id)
+            
+            if glyph is None:
+                if item is not None:
+                    self.glyph_items.remove(item)
+                    item.remove_glyph()
+            
+            elif item is None:
+                self._create_glyph_item(glyph_id, glyph, reset_selection = False, set_selected = False)
+            
+            else:
+                # Brightness and effects reach the visualizer and the phone through the restore itself.
+                item.sync_with_glyph(glyph)
+        
+        logger.debug(f"History: {step.label}, {self.composition.history.get_metrics()}")
+        self.elements_changed.emit()
 
     def spawn_glyph_on_track(self, track_index):
         audio_duration = Player.player.duration_ms
@@ -301,15 +340,16 @@ class GlyphController(QObject):
         
         self.conductor.scene.clearSelection()
 
-        for glyph_data in self.copied_data:
-            new_id, new_data = self.composition.copy_glyph(
-                glyph_data,
-                time_offset,
-                audio_ms
-            )
+        with self.composition.batch("Paste"):
+            for glyph_data in self.copied_data:
+                new_id, new_data = self.composition.copy_glyph(
+                    glyph_data,
+                    time_offset,
+                    audio_ms
+                )
 
-            if new_id is not None:
-                self._create_glyph_item(new_id, new_data, reset_selection=False)
+                if new_id is not None:
+                    self._create_glyph_item(new_id, new_data, reset_selection=False)
 
         self.elements_changed.emit()
     
@@ -431,12 +471,27 @@ class GlyphController(QObject):
             new_start = max(0, item.start_ms + delta_ms)
             new_start = min(new_start, self.composition.duration_ms - item.duration_ms)
             
-            self.updates[item.glyph_id] = {'start': int(new_start)}
+            self._stage_update(item.glyph_id, start = int(new_start))
             
             item.update_geometry(start_ms = new_start)
     
+    def _stage_update(self, glyph_id, **fields):
+        # The glyph table only takes whole glyphs, so partial edits are layered over the stored one.
+        glyph = self.updates.get(glyph_id)
+
+        if glyph is None:
+            stored = self.composition.get_glyph(glyph_id)
+
+            if stored is None:
+                return
+
+            glyph = GlyphTable.GlyphView(stored)
+
+        self.updates[glyph_id] = glyph.replace(**fields)
+
     def finish_edit_operation(self):
-        self.composition.update_bunch_of_glyphs(self.updates)
+        self.composition.update_bunch_of_glyphs({glyph_id: glyph.to_dict() for glyph_id, glyph in self.updates.items()})
+        self.updates = {}
     
     def resize_selection(self, delta_ms: float, from_left: bool = False):
         selected_items: list[CompositorUI.GlyphItem] = [item for item in self.conductor.scene.selectedItems() if item in self.glyph_items]
@@ -453,12 +508,12 @@ class GlyphController(QObject):
                 effective_delta = new_start - item.start_ms
                 new_duration = item.duration_ms - effective_delta
                 
-                self.updates[item.glyph_id] = {'start': int(new_start), 'duration': int(new_duration)}
+                self._stage_update(item.glyph_id, start = int(new_start), duration = int(new_duration))
                 item.update_geometry(start_ms = new_start, duration_ms = new_duration)
             
             else:
                 new_duration = max(10, item.duration_ms + delta_ms)
-                self.updates[item.glyph_id] = {'duration': int(new_duration)}
+                self._stage_update(item.glyph_id, duration = int(new_duration))
                 item.update_geometry(duration_ms = new_duration)
     
     def _update_popup(self, text, target_item = None, plan_hide = False):
@@ -702,6 +757,10 @@ class ScrollableContent(QGraphicsView):
         
         self._is_auto_scroll_active = False
 
+        # Effect previews
+        self.effect_previews = collections.OrderedDict()
+        self.effect_targets = []
+
         # Scaling & Time
         self.px_per_sec = CurrentSettings["default_scaling"]
     
@@ -848,6 +907,8 @@ class ScrollableContent(QGraphicsView):
             self.composition.bpm
         )
         self.glyph_visualizer.setParent(None)
+        self.glyph_visualizer.set_schedule(self.composition.glyphs.visualizator_data)
+        self.composition.glyphs.subscribe(self.glyph_visualizer.apply_schedule_changes)
         
         self.glyph_controller.elements_changed.connect(self.main_window_ref.on_elements_changed)
         
@@ -865,8 +926,12 @@ class ScrollableContent(QGraphicsView):
         logger.warning("Unloading composition and clearing state")
         
         self.glyph_controller.clear_glyphs()
+        self.clear_effect_previews()
 
         if self.composition:
+            self.composition.glyphs.stop_expansion()
+            self.composition.flush_save()
+            self.composition.glyphs.unsubscribe(self.glyph_visualizer.apply_schedule_changes)
             self.composition.syncer.stop_scanning_loop()
             self.composition.syncer.error_occurred.disconnect(self.show_error_dialog)
             self.composition = None
@@ -1017,9 +1082,8 @@ class ScrollableContent(QGraphicsView):
     def _start_playback(self):
         self.playhead_timer.start()
         
-        position = self.get_playhead_ms()
+        position = self.playback_manager.get_position_ms()
         
-        self.glyph_visualizer.set_schedule(self.composition.glyphs.visualizator_data)
         self.glyph_visualizer.play_all(position)
         
         self.composition.syncer.play(position)
@@ -1197,7 +1261,8 @@ class ScrollableContent(QGraphicsView):
             
             item.update_geometry(duration_ms = glyph_copy["duration"])
         
-        self.composition.update_bunch_of_glyphs(updated)
+        with self.composition.batch(title):
+            self.composition.update_bunch_of_glyphs(updated)
 
     def brightness_control_popup(self):
         self.control_popup("Brightness", "Percent", "brightness", max_val = 100)
@@ -1302,12 +1367,7 @@ class ScrollableContent(QGraphicsView):
             Utils.ui_sound("MenuOpen")
             self.update()
 
-            def on_apply_requested_factory(name, settings):
-                for sel_id in selected_element_ids:
-                    element = self.composition.get_glyph(sel_id)
-                    if element:
-                        result = GlyphEffects.effectCallback(name, settings, element)
-                        self.composition.replace_glyph(sel_id, result)
+            self.effect_targets = selected_element_ids
 
             has_non_segmented = [
                 not is_segmented(self.composition.get_glyph(sel_id)["track"], self.composition.model)
@@ -1335,15 +1395,15 @@ class ScrollableContent(QGraphicsView):
             else:
                 effects = GlyphEffects.all()
 
-            effect_entries = []
-            for effect_name, config in effects.items():
-                preview_widget = UI.EffectPreviewWidget(effect_name, config, clicked_element)
-                preview_widget.apply_requested.connect(
-                    lambda name = effect_name, s =
-                    config: on_apply_requested_factory(name, s)
+            effect_entries = [
+                (
+                    effect_name,
+                    UI.LazySubmenu(
+                        lambda name = effect_name, config = config: [("preview_widget", UI.LentWidget(self._effect_preview(name, config, clicked_element)))]
+                    )
                 )
-                
-                effect_entries.append((effect_name, [("preview_widget", preview_widget)]))
+                for effect_name, config in effects.items()
+            ]
 
             entries = [
                 ("Delete", self.glyph_controller.delete_glyphs),
@@ -1374,6 +1434,43 @@ class ScrollableContent(QGraphicsView):
                 "An unexpected error occurred while opening the context menu."
             ).exec_()
 
+    def _effect_preview(self, effect_name, config, glyph):
+        key = (effect_name, glyph["duration"], glyph["brightness"])
+        preview_widget = self.effect_previews.get(key)
+
+        if preview_widget is not None:
+            self.effect_previews.move_to_end(key)
+            return preview_widget
+
+        preview_widget = UI.EffectPreviewWidget(effect_name, config, glyph)
+        preview_widget.apply_requested.connect(self._apply_effect_to_targets)
+
+        self.effect_previews[key] = preview_widget
+        if len(self.effect_previews) > EFFECT_PREVIEW_CACHE_SIZE:
+            _, evicted = self.effect_previews.popitem(last = False)
+            self._drop_effect_preview(evicted)
+
+        return preview_widget
+
+    def _drop_effect_preview(self, preview_widget):
+        preview_widget.apply_requested.disconnect(self._apply_effect_to_targets)
+        preview_widget.deleteLater()
+
+    def clear_effect_previews(self):
+        for preview_widget in self.effect_previews.values():
+            self._drop_effect_preview(preview_widget)
+
+        self.effect_previews.clear()
+        self.effect_targets = []
+
+    def _apply_effect_to_targets(self, name, settings):
+        with self.composition.batch(f"Apply {name}"):
+            for sel_id in self.effect_targets:
+                element = self.composition.get_glyph(sel_id)
+                if element:
+                    result = GlyphEffects.effectCallback(name, settings, element)
+                    self.composition.replace_glyph(sel_id, result)
+
     def show_error_dialog(self, title, message):
         error_dialog = UI.ErrorWindow(title, message, "Oh nah", self.composition.bpm, self.playback_manager)
         error_dialog.exec_()
@@ -1469,6 +1566,7 @@ class CompositorWidget(QWidget):
         self.content_widget = ScrollableContent(self)
 
         self.overall_layout.addWidget(self.content_widget)
+        self.audio_stats_overlay = UI.AudioStatsOverlay(self.playback_manager, self.content_widget)
 
         # Focus Fix
         for child in self.findChildren(QWidget):
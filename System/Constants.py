@@ -265,12 +265,7 @@ FPS_120 = 8
 FPS_30 = 33
 
 # Models and Related
-ModelSegments = {
-    "PHONE1": {"7": 8},
-    "PHONE2": {"4": 16, "10": 8},
-    "PHONE2A": {"1": 24},
-    "PHONE3A": {"1": 20, "2": 11, "3": 5},
-}
+from System.ModelData import ModelSegments, GLYPH_MAX_SEGMENTS
 
 def get_segments(model, track):
     return ModelSegments.get(model, {}).get(track)
@@ -300,14 +295,22 @@ void main() {
 }
 """
 
+EFFECT_PREVIEW_CACHE_SIZE = 24
+JOURNAL_COMPACT_RATIO = 0.5
+EFFECT_POOL_MIN_GLYPHS = 256
+EFFECT_POOL_CHUNK = 32
+
 GLYPH_FS = """#version 330 core
 flat in float vSegIdx;
 out vec4 FragColor;
 uniform vec3 uColorOn;
 uniform vec3 uColorOff;
-uniform float uLevels[128];
+layout (std140) uniform Levels {
+    vec4 uLevels[64];
+};
 void main() {
-    float level = uLevels[int(vSegIdx)] / 100.0;
+    int idx = int(vSegIdx);
+    float level = uLevels[idx >> 2][idx & 3] / 100.0;
     FragColor = vec4(mix(uColorOff, uColorOn, level), 1.0);
 }
 """
@@ -481,6 +484,72 @@ SettingsDict = {
                 "1024": 1024
             },
             "default": "512"
+        },
+        {
+            "type": "selector",
+            "title": "Audio Block Size: Applies on next project load.",
+            "key": "audio_blocksize",
+            "map": {
+                "128": 128,
+                "256": 256,
+                "512": 512,
+                "1024": 1024
+            },
+            "default": "256"
+        },
+        {
+            "type": "selector",
+            "title": "Audio Latency: Applies on next project load.",
+            "key": "audio_latency",
+            "map": {
+                "Low": "low",
+                "High": "high"
+            },
+            "default": "Low"
+        },
+        {
+            "type": "checkbox",
+            "title": "Audio Stats Overlay",
+            "key": "audio_stats_overlay",
+            "description": "Shows audio callback load and dropouts in the compositor.",
+            "default": False
+        },
+        {
+            "type": "checkbox",
+            "title": "Compiled Glyph Timeline",
+            "key": "compiled_timeline",
+            "description": "Pre-renders glyph brightness per frame for smoother previews on effect heavy compositions. Uses more memory. Applies when a project is opened.",
+            "default": False
+        },
+        {
+            "type": "selector",
+            "title": "Autosave Delay",
+            "key": "autosave_delay",
+            "map": {
+                "Instant": 0,
+                "0.5s": 500,
+                "1s": 1000,
+                "3s": 3000
+            },
+            "default": "1s"
+        },
+        {
+            "type": "checkbox",
+            "title": "Binary Project Files",
+            "key": "binary_saves",
+            "description": "Saves projects as compact binary Save.cass files instead of Save.json. Projects switch format the next time they are opened.",
+            "default": False
+        },
+        {
+            "type": "selector",
+            "title": "Undo History Size",
+            "key": "history_budget",
+            "map": {
+                "8 MB": 8,
+                "32 MB": 32,
+                "128 MB": 128
+            },
+            "default": "32 MB"
         }
     ],
 
@@ -0,0 +1,377 @@
+import math
+import cmath
+import time
+import collections
+
+import numpy as np
+
+def linear(t):
+    return t
+
+def smoothstep(t):
+    return t * t * (3.0 - 2.0 * t)
+
+def out_cubic(t):
+    return 1 - (1 - t) ** 3
+
+Easings = {
+    "linear": linear,
+    "smoothstep": smoothstep,
+    "out_cubic": out_cubic
+}
+
+class ParameterRamp:
+    __slots__ = ("start", "target", "total", "done", "easing")
+
+    def __init__(self, start, target, total_frames, easing):
+        self.start = float(start)
+        self.target = float(target)
+        self.total = max(1, int(total_frames))
+        self.done = 0
+        self.easing = easing
+
+    def advance(self, frames):
+        self.done = min(self.total, self.done + frames)
+        t = self.done / self.total
+
+        return self.start + (self.target - self.start) * self.easing(t)
+
+    @property
+    def finished(self):
+        return self.done >= self.total
+
+class NodeStats:
+    __slots__ = ("calls", "total", "peak", "last")
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.calls = 0
+        self.total = 0.0
+        self.peak = 0.0
+        self.last = 0.0
+
+    def record(self, elapsed):
+        self.calls += 1
+        self.total += elapsed
+        self.last = elapsed
+        self.peak = max(self.peak, elapsed)
+
+    def as_dict(self, budget):
+        average = self.total / self.calls if self.calls else 0.0
+
+        return {
+            "calls": self.calls,
+            "avg_us": average * 1e6,
+            "peak_us": self.peak * 1e6,
+            "last_us": self.last * 1e6,
+            "budget_share": average / budget if budget else 0.0
+        }
+
+class DSPNode:
+    # Subclasses declare their parameters with defaults, optional (low, high) ranges and the size of their per - channel state.
+    name = "node"
+    params = {}
+    ranges = {}
+    state_size = 0
+
+    def __init__(self, channels, fs, blocksize):
+        self.channels = channels
+        self.fs = float(fs)
+        self.blocksize = blocksize
+
+        self.values = dict(self.params)
+        self.state = np.zeros((channels, self.state_size), dtype = np.float64) if self.state_size else None
+        self.stats = NodeStats()
+
+        self._ramps = {}
+        self._commands = collections.deque()
+
+        self.on_params_changed()
+
+    # GUI thread - - - - - - - - - - - - - - - - - - - - - - - -
+
+    def set(self, duration = 0.0, easing = "smoothstep", reset_state = False, **values):
+        unknown = set(values) - set(self.params)
+
+        if unknown:
+            raise KeyError(f"{self.name} has no parameters {sorted(unknown)}")
+
+        for key, value in values.items():
+            low, high = self.ranges.get(key, (-math.inf, math.inf))
+
+            if not low <= value <= high:
+                raise ValueError(f"{self.name} {key} = {value} is outside {low}..{high}")
+
+        self._commands.append((values, float(duration), Easings[easing], reset_state))
+
+    def get(self, key):
+        return self.values[key]
+
+    # Audio thread - - - - - - - - - - - - - - - - - - - - - - -
+
+    def _apply_commands(self):
+        changed = False
+
+        while self._commands:
+            values, duration, easing, reset_state = self._commands.popleft()
+
+            for key, value in values.items():
+                if duration <= 0.0:
+                    self._ramps.pop(key, None)
+                    self.values[key] = float(value)
+
+                else:
+                    self._ramps[key] = ParameterRamp(self.values[key], value, duration * self.fs, easing)
+
+            if reset_state:
+                self.reset()
+
+            changed = True
+
+        return changed
+
+    def _advance_ramps(self, frames):
+        if not self._ramps:
+            return False
+
+        for key, ramp in list(self._ramps.items()):
+            self.values[key] = ramp.advance(frames)
+
+            if ramp.finished:
+                del self._ramps[key]
+
+        return True
+
+    def prepare(self, frames):
+        changed = self._apply_commands()
+        changed = self._advance_ramps(frames) or changed
+
+        if changed:
+            self.on_params_changed()
+
+    def reset(self):
+        if self.state is not None:
+            self.state.fill(0.0)
+
+    def on_params_changed(self):
+        pass
+
+    def is_active(self):
+        return True
+
+    def process(self, block):
+        raise NotImplementedError
+
+class MidpassNode(DSPNode):
+    name = "midpass"
+    params = {
+        "center": 1000.0,
+        "q": 1.0,
+        "mix": 0.0,
+        "gain": 1.0
+    }
+    state_size = 4
+
+    def on_params_changed(self):
+        omega = 2.0 * math.pi * (self.values["center"] / self.fs)
+        sn = math.sin(omega)
+        cs = math.cos(omega)
+        alpha = sn / (2.0 * max(0.001, self.values["q"]))
+
+        a0 = 1.0 + alpha
+
+        self._b0 = alpha / a0
+        self._b2 = -alpha / a0
+        self._a1 = (-2.0 * cs) / a0
+        self._a2 = (1.0 - alpha) / a0
+        self._impulse = None
+
+    def _impulse_response(self, frames):
+        # Response of 1 / (1 + a1 z^-1 + a2 z^-2) from its poles, recomputed only when the coefficients change.
+        if self._impulse is not None and len(self._impulse) >= frames:
+            return self._impulse[:frames]
+
+        a1, a2 = self._a1, self._a2
+        root = cmath.sqrt(a1 * a1 - 4.0 * a2)
+        p1, p2 = (-a1 + root) / 2.0, (-a1 - root) / 2.0
+        n = np.arange(max(frames, self.blocksize) + 1)
+
+        if abs(p1 - p2) < 1e-9:
+            impulse = (n + 1) * p1 ** n
+
+        else:
+            impulse = (p1 ** (n + 1) - p2 ** (n + 1)) / (p1 - p2)
+
+        self._impulse = np.real(impulse)
+        return self._impulse[:frames]
+
+    def is_active(self):
+        return self.values["mix"] > 0.0
+
+    def process(self, block):
+        # The biquad runs a block at a time: the feed - forward part and the carried - in state become one input
+        # sequence, and the feedback part is a convolution with the filter's impulse response.
+        b0, b2, a1, a2 = self._b0, self._b2, self._a1, self._a2
+        frames = block.shape[0]
+        mix = max(0.0, min(1.0, self.values["mix"]))
+        wet = mix * self.values["gain"]
+        dry = 1.0 - mix
+
+        impulse = self._impulse_response(frames)
+
+        for ch in range(block.shape[1]):
+            x1, x2, y1, y2 = self.state[ch]
+            x = block[:, ch].astype(np.float64)
+
+            previous = np.empty(frames + 2)
+            previous[0], previous[1] = x2, x1
+            previous[2:] = x
+
+            drive = b0 * x + b2 * previous[:frames]
+            drive[0] -= a1 * y1 + a2 * y2
+
+            if frames > 1:
+                drive[1] -= a2 * y1
+
+            y = np.convolve(drive, impulse)[:frames]
+
+            block[:, ch] = dry * x + wet * y
+            self.state[ch] = (previous[-1], previous[-2], y[-1], y[-2] if frames > 1 else y1)
+
+class BitcrushNode(DSPNode):
+    name = "bitcrush"
+    params = {
+        "bits": 24.0,
+        "downsample": 1.0,
+        "mix": 0.0
+    }
+    state_size = 2
+
+    def is_active(self):
+        return self.values["mix"] > 0.0
+
+    def process(self, block):
+        frames = block.shape[0]
+        bits = int(max(1, min(24, round(self.values["bits"]))))
+        down = max(1, int(round(self.values["downsample"])))
+        mix = float(max(0.0, min(1.0, self.values["mix"])))
+        levels = float((1 << bits) - 1)
+
+        n = np.arange(frames)
+
+        for ch in range(block.shape[1]):
+            held, counter = self.state[ch]
+            first = max(0, int(counter))
+            column = block[:, ch]
+
+            if first < frames:
+                take = first + ((n - first) // down) * down
+                sampled = np.where(n >= first, column[np.maximum(take, first)], held)
+                last_take = take[-1]
+
+                self.state[ch, 0] = column[last_take]
+                self.state[ch, 1] = down - 1 - (frames - 1 - last_take)
+
+            else:
+                sampled = np.full(frames, held)
+                self.state[ch, 1] = counter - frames
+
+            crushed = np.round(((sampled + 1.0) * 0.5) * levels) / levels * 2.0 - 1.0
+            column *= (1.0 - mix)
+            column += (mix * crushed).astype(block.dtype)
+
+class ChannelDelayNode(DSPNode):
+    name = "delay"
+    params = {
+        "left_ms": 0.0,
+        "right_ms": 0.0
+    }
+    ranges = {
+        "left_ms": (0.0, 1000.0),
+        "right_ms": (0.0, 1000.0)
+    }
+
+    def __init__(self, channels, fs, blocksize):
+        # The history holds exactly the longest delay the ranges allow, set() rejects anything beyond it.
+        self.max_delay_ms = max(high for _, high in self.ranges.values())
+        self.history_len = int(self.max_delay_ms * fs / 1000.0) + 2
+        self._buffer = np.zeros((self.history_len + blocksize + 1, channels), dtype = np.float32)
+        self._was_active = False
+
+        super().__init__(channels, fs, blocksize)
+
+    def reset(self):
+        self._buffer.fill(0.0)
+
+    def is_active(self):
+        active = self.values["left_ms"] > 0.0 or self.values["right_ms"] > 0.0 or bool(self._ramps)
+
+        # History is only fed while the node runs, so drop it once bypassed instead of replaying stale audio later.
+        if self._was_active and not active:
+            self.reset()
+
+        self._was_active = active
+        return active
+
+    def process(self, block):
+        frames = block.shape[0]
+
+        if frames + 1 > self._buffer.shape[0] - self.history_len:
+            grown = np.zeros((self.history_len + frames + 1, self.channels), dtype = np.float32)
+            grown[:self.history_len] = self._buffer[:self.history_len]
+            self._buffer = grown
+
+        buffer = self._buffer
+        hist = self.history_len
+        buffer[hist:hist + frames] = block
+
+        delays = (self.values["left_ms"], self.values["right_ms"])
+        n = np.arange(frames)
+
+        for ch in range(block.shape[1]):
+            delay_ms = max(0.0, min(self.max_delay_ms, delays[min(ch, 1)]))
+            read = hist + n - delay_ms * self.fs / 1000.0
+
+            idx = np.floor(read).astype(int)
+            frac = (read - idx).astype(np.float32)
+
+            s0 = buffer[idx, ch]
+            s1 = buffer[idx + 1, ch]
+            block[:, ch] = (1.0 - frac) * s0 + frac * s1
+
+        buffer[:hist] = buffer[frames:frames + hist]
+
+class EffectChain:
+    def __init__(self, channels, fs, blocksize, node_types):
+        self.channels = channels
+        self.fs = fs
+        self.blocksize = blocksize
+
+        self.nodes = [node_type(channels, fs, blocksize) for node_type in node_types]
+        self._by_name = {node.name: node for node in self.nodes}
+
+    def __getitem__(self, name):
+        return self._by_name[name]
+
+    def reset(self):
+        for node in self.nodes:
+            node.set(reset_state = True)
+
+    def process(self, block):
+        frames = block.shape[0]
+
+        for node in self.nodes:
+            node.prepare(frames)
+
+            if not node.is_active():
+                continue
+
+            start = time.perf_counter()
+            node.process(block)
+            node.stats.record(time.perf_counter() - start)
+
+    def get_stats(self):
+        budget = self.blocksize / float(self.fs)
+        return {node.name: node.stats.as_dict(budget) for node in self.nodes}
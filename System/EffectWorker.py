@@ -0,0 +1,6 @@
+# Effect pool entry point, a plain importable function so workers can unpickle it by name.
+from System import GlyphEffects
+
+def expand_chunk(chunk, bpm, model):
+    # Chunk is a list of (glyph_id, glyph).
+    return [(glyph_id, GlyphEffects.effect_to_glyph(glyph, bpm, model, seed = glyph_id)) for glyph_id, glyph in chunk]
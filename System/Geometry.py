@@ -0,0 +1,171 @@
+import os
+import re
+import json
+import time
+import hashlib
+import traceback
+
+import numpy as np
+
+from loguru import logger
+from System import Utils
+
+GEOMETRY_VERSION = 1
+POINTS_PER_SEGMENT = 20
+CURVE_STEPS = 48
+
+def path_elements(d_string):
+    # Supports the M, L, H, V, C and Z commands used by the model maps, lines become cubics with evenly spaced controls.
+    tokens = re.findall(r'([a-zA-Z]|-?[\d\.]+)', d_string)
+
+    elements = []
+    current = np.zeros(2)
+    subpath_start = current
+
+    def line_to(end):
+        elements.append([current, current + (end - current) / 3, current + (end - current) * 2 / 3, end])
+        return end
+
+    i = 0
+    while i < len(tokens):
+        cmd = tokens[i]
+
+        if cmd[0].isalpha():
+            i += 1
+
+        if cmd == 'M':
+            current = np.array([float(tokens[i]), float(tokens[i + 1])])
+            subpath_start = current
+            i += 2
+
+        elif cmd == 'L':
+            current = line_to(np.array([float(tokens[i]), float(tokens[i + 1])]))
+            i += 2
+
+        elif cmd == 'H':
+            current = line_to(np.array([float(tokens[i]), current[1]]))
+            i += 1
+
+        elif cmd == 'V':
+            current = line_to(np.array([current[0], float(tokens[i])]))
+            i += 1
+
+        elif cmd == 'C':
+            c1 = np.array([float(tokens[i]), float(tokens[i + 1])])
+            c2 = np.array([float(tokens[i + 2]), float(tokens[i + 3])])
+            end = np.array([float(tokens[i + 4]), float(tokens[i + 5])])
+
+            elements.append([current, c1, c2, end])
+            current = end
+            i += 6
+
+        elif cmd in ('Z', 'z'):
+            current = line_to(subpath_start)
+
+    return np.array(elements, dtype = np.float64).reshape(-1, 4, 2)
+
+def evaluate_cubics(controls, t):
+    t = t[..., None]
+    mt = 1 - t
+
+    return (mt ** 3) * controls[..., 0, :] + 3 * (mt ** 2) * t * controls[..., 1, :] + 3 * mt * (t ** 2) * controls[..., 2, :] + (t ** 3) * controls[..., 3, :]
+
+def sample_path(d_string, num_segs, pts_per_seg = POINTS_PER_SEGMENT):
+    # Mirrors QPainterPath.pointAtPercent: the element is picked by length, the position inside it is linear in t.
+    elements = path_elements(d_string)
+    percents = (np.arange(num_segs)[:, None] + np.linspace(0.0, 1.0, pts_per_seg)[None, :]) / num_segs
+
+    if not len(elements):
+        return np.zeros(percents.shape + (2,))
+
+    steps = np.linspace(0.0, 1.0, CURVE_STEPS + 1)
+    polylines = evaluate_cubics(elements[:, None], np.broadcast_to(steps, (len(elements), len(steps))))
+    lengths = np.linalg.norm(np.diff(polylines, axis = 1), axis = -1).sum(axis = 1)
+
+    ends = np.cumsum(lengths)
+    targets = percents * ends[-1]
+
+    element = np.minimum(np.searchsorted(ends, targets, side = "left"), len(elements) - 1)
+    starts = ends[element] - lengths[element]
+    local_t = np.clip((targets - starts) / np.where(lengths[element] > 0, lengths[element], 1), 0.0, 1.0)
+
+    return evaluate_cubics(elements[element], local_t)
+
+def segment_strips(points, first_seg_index):
+    tangents = np.empty_like(points)
+    tangents[:, :-1] = np.diff(points, axis = 1)
+    tangents[:, -1] = points[:, -1] - points[:, -2]
+
+    length = np.linalg.norm(tangents, axis = -1, keepdims = True)
+    length[length == 0] = 1
+    normals = np.stack([-tangents[..., 1], tangents[..., 0]], axis = -1) / length
+
+    num_segs, pts = points.shape[:2]
+    seg_index = (first_seg_index + np.arange(num_segs, dtype = np.float64))[:, None, None].repeat(pts, axis = 1)
+
+    verts = np.empty((num_segs, pts, 2, 5), dtype = np.float32)
+    verts[:, :, 0] = np.concatenate([points, normals, seg_index], axis = -1)
+    verts[:, :, 1] = np.concatenate([points, -normals, seg_index], axis = -1)
+
+    return verts.reshape(-1, 5)
+
+def build_model_geometry(map_data, pts_per_seg = POINTS_PER_SEGMENT):
+    map_w, map_h = map_data["size"]
+
+    vbo_parts, ids, seg_counts = [], [], []
+    seg_offset = 0
+
+    for gid, data in map_data["glyphs"].items():
+        num_segs = data.get("segments", 1)
+        px, py = data["position"]
+
+        points = sample_path(data["svg"], num_segs, pts_per_seg)
+        points[..., 0] += px - map_w / 2
+        points[..., 1] = -(points[..., 1] + py) + map_h / 2
+
+        vbo_parts.append(segment_strips(points, seg_offset))
+        ids.append(str(gid))
+        seg_counts.append(num_segs)
+        seg_offset += num_segs
+
+    total_segs = seg_offset
+    verts_per_seg = pts_per_seg * 2
+
+    return {
+        "vbo_data": np.ascontiguousarray(np.concatenate(vbo_parts) if vbo_parts else np.zeros((0, 5)), dtype = np.float32),
+        "starts": (np.arange(total_segs) * verts_per_seg).astype(np.int32),
+        "counts": np.full(total_segs, verts_per_seg, dtype = np.int32),
+        "ids": np.array(ids),
+        "seg_counts": np.array(seg_counts, dtype = np.int32)
+    }
+
+def geometry_key(map_data, pts_per_seg = POINTS_PER_SEGMENT):
+    payload = json.dumps([GEOMETRY_VERSION, pts_per_seg, CURVE_STEPS, map_data], sort_keys = True, default = str)
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()[:16]
+
+def load_model_geometry(model, map_data):
+    path = Utils.get_cache_path(os.path.join("Geometry", f"{model}_{geometry_key(map_data)}.npz"))
+
+    if os.path.exists(path):
+        try:
+            with np.load(path) as cached:
+                return {key: cached[key] for key in cached.files}
+
+        except Exception:
+            logger.warning(f"Discarding unreadable geometry cache {path}: {traceback.format_exc()}")
+
+    start = time.perf_counter()
+    geometry = build_model_geometry(map_data)
+
+    try:
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            np.savez(f, **geometry)
+
+        os.replace(tmp_path, path)
+
+    except Exception:
+        logger.warning(f"Could not write geometry cache {path}: {traceback.format_exc()}")
+
+    logger.debug(f"Tessellated {model} glyph geometry in {(time.perf_counter() - start) * 1000:.1f} ms")
+    return geometry
@@ -1,6 +1,12 @@
+import json
+import zlib
 import random
+import collections
 
-from System.Constants import *
+from System.ModelData import ModelSegments
+
+EFFECT_CACHE_BUDGET = 64 * 1024 * 1024
+EFFECT_CACHE_ITEM_BYTES = 400
 
 _example_glyph = {
     "start": 200,
@@ -27,18 +33,126 @@ def parse_effect_args(config: dict, settings_meta: dict) -> dict:
 
     return args
 
-def effect_to_glyph(element, bpm = None, model = None):
+class EffectCache:
+    # Expansions only depend on the start through a plain offset, so they are stored relative to it and shifted on hits.
+    def __init__(self, budget_bytes):
+        self.budget_bytes = budget_bytes
+        self.entries = collections.OrderedDict()
+        self.size = 0
+
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, start):
+        entry = self.entries.get(key)
+
+        if entry is None:
+            self.misses += 1
+            return None
+
+        self.entries.move_to_end(key)
+        self.hits += 1
+
+        return _shifted(entry[0], start)
+
+    def put(self, key, start, items):
+        size = len(items) * EFFECT_CACHE_ITEM_BYTES
+
+        if size > self.budget_bytes:
+            return
+
+        if key in self.entries:
+            self.size -= self.entries.pop(key)[1]
+
+        self.entries[key] = (_shifted(items, -start), size)
+        self.size += size
+
+        while self.size > self.budget_bytes:
+            _, (_, evicted) = self.entries.popitem(last = False)
+            self.size -= evicted
+
+    def clear(self):
+        self.entries.clear()
+        self.size = 0
+
+    def get_metrics(self):
+        return {
+            "entries": len(self.entries),
+            "bytes": self.size,
+            "hits": self.hits,
+            "misses": self.misses
+        }
+
+def _shifted(items, offset):
+    shifted = []
+
+    for item in items:
+        item = dict(item, start = item["start"] + offset)
+
+        if "segments" in item:
+            item["segments"] = list(item["segments"])
+
+        shifted.append(item)
+
+    return shifted
+
+def _seed(value):
+    return zlib.crc32(str(value).encode("utf-8"))
+
+cache = EffectCache(EFFECT_CACHE_BUDGET)
+
+def _cache_key(element, bpm, model, seed):
+    name = element["effect"]["name"]
+    randomized = EffectsConfig[name].get("randomized", False)
+
+    # Random effects draw from an RNG seeded by the glyph id, falling back to the glyph itself, so they can be cached.
+    if randomized and seed is None:
+        seed = f"{element['track']}:{element['start']}:{element['duration']}"
+
+    key = (
+        name,
+        json.dumps(element["effect"]["settings"], sort_keys = True, default = str),
+        element["duration"],
+        element["brightness"],
+        tuple(element["segments"]) if "segments" in element else None,
+        element["track"],
+        bpm,
+        model,
+        str(seed) if randomized else None
+    )
+
+    return key, seed
+
+def remember(element, bpm, model, seed, items):
+    # Results computed elsewhere, e.g. in the load pool, still warm this process's cache.
+    key, _ = _cache_key(element, bpm, model, seed)
+    cache.put(key, element["start"], items)
+
+def effect_to_glyph(element, bpm = None, model = None, seed = None):
     name = element["effect"]["name"]
     config = element["effect"]["settings"]
 
     if name == "None": return []
 
     effect_info = EffectsConfig[name]
+    randomized = effect_info.get("randomized", False)
+    key, seed = _cache_key(element, bpm, model, seed)
+
+    result = cache.get(key, element["start"])
+
+    if result is not None:
+        return result
+
     effect_fn = effect_info.get("function")
     settings_meta = effect_info.get("settings", {})
     kwargs = parse_effect_args(config, settings_meta)
+
+    if randomized:
+        kwargs["rng"] = random.Random(_seed(seed))
     
     result = effect_fn(element, model, bpm = bpm, **kwargs)
+    cache.put(key, element["start"], result)
+
     return result
 
 def effectCallback(name, settings, element):
@@ -153,7 +267,7 @@ def fade_to(glyph: dict, model: str, bpm: int, fade_to_brightness = 100):
     
     return [item]
 
-def glitch(glyph: dict, model: str, bpm: int, fps = 20.0, duty_cycle = 0.7, min_br_ratio = 0.3, bpm_snap=False, enable_fadeout = False):
+def glitch(glyph: dict, model: str, bpm: int, fps = 20.0, duty_cycle = 0.7, min_br_ratio = 0.3, bpm_snap=False, enable_fadeout = False, rng = random):
     if bpm_snap:
         fps = (bpm / 60) * bpm_snap
     
@@ -171,8 +285,8 @@ def glitch(glyph: dict, model: str, bpm: int, fps = 20.0, duty_cycle = 0.7, min_
         t0 = t
         t1 = min(t + frame, t_end)
 
-        chosen = random.sample(available_segments, count)
-        br = random.randint(min_br, head_br)
+        chosen = rng.sample(available_segments, count)
+        br = rng.randint(min_br, head_br)
 
         item = {
             "start": t0,
@@ -837,6 +951,7 @@ EffectsConfig = {
     "Glitch": {
         "segmented": True,
         "supports_segmentation": True,
+        "randomized": True,
         "function": glitch,
         "settings": [
             {
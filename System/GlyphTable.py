@@ -0,0 +1,561 @@
+import copy
+import json
+import time
+import types
+import bisect
+import threading
+import collections.abc
+
+import numpy as np
+
+from System.ModelData import GLYPH_MAX_SEGMENTS
+
+COLUMNS = {
+    "start": np.float64,
+    "duration": np.float64,
+    "track": np.int16,
+    "brightness": np.float64,
+    "end_brightness": np.float64,
+    "effect": np.int32,
+    "segments": np.uint64,
+    "has_segments": np.bool_,
+    "alive": np.bool_
+}
+
+# Segments are a bitmask split over 64 bit words, one row of words per glyph.
+SEGMENT_WORDS = -(-GLYPH_MAX_SEGMENTS // 64)
+COLUMN_SHAPES = {"segments": (SEGMENT_WORDS,)}
+
+# Bulk shifts / scales touching more glyphs than this drop the affected track indexes instead of patching them.
+INTERVAL_PATCH_LIMIT = 64
+
+def _number(value):
+    value = float(value)
+    return int(value) if value.is_integer() else value
+
+class TrackIntervals:
+    # Keys of one track sorted by start. The longest duration seen bounds how far back an overlapping glyph can start.
+    def __init__(self, keys = (), starts = (), ends = ()):
+        self.keys = list(keys)
+        self.starts = list(starts)
+        self.spans = {key: (start, end) for key, start, end in zip(self.keys, self.starts, ends)}
+        self.max_duration = max((end - start for start, end in self.spans.values()), default = 0.0)
+
+    def __len__(self):
+        return len(self.keys)
+
+    def add(self, key, start, end):
+        i = bisect.bisect_right(self.starts, start)
+
+        self.keys.insert(i, key)
+        self.starts.insert(i, start)
+        self.spans[key] = (start, end)
+
+        # Only grows, a stale larger value just widens the search window.
+        self.max_duration = max(self.max_duration, end - start)
+
+    def remove(self, key):
+        start, _ = self.spans.pop(key)
+        i = bisect.bisect_left(self.starts, start)
+
+        while self.keys[i] != key:
+            i += 1
+
+        del self.keys[i]
+        del self.starts[i]
+
+    def query(self, start, end):
+        # Keys overlapping [start, end) in start order.
+        lo = bisect.bisect_right(self.starts, start - self.max_duration)
+        hi = bisect.bisect_left(self.starts, end)
+        spans = self.spans
+
+        return [key for key in self.keys[lo:hi] if spans[key][1] > start]
+
+_REMOVED = object()
+
+class GlyphView(collections.abc.Mapping):
+    # Read - only glyph sharing its base dict, fields set through replace() are layered on top instead of copying it.
+    __slots__ = ("base", "overrides")
+
+    def __init__(self, base, overrides = None):
+        self.base = base
+        self.overrides = overrides or {}
+
+    def __getitem__(self, name):
+        if name in self.overrides:
+            value = self.overrides[name]
+
+            if value is _REMOVED:
+                raise KeyError(name)
+
+            return value
+
+        return self.base[name]
+
+    def __iter__(self):
+        for name in self.base:
+            if name not in self.overrides:
+                yield name
+
+        for name, value in self.overrides.items():
+            if value is not _REMOVED:
+                yield name
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+    def __repr__(self):
+        return f"GlyphView({dict(self)!r})"
+
+    def replace(self, **fields):
+        # None drops a field, the same way the editor stores "no segments".
+        overrides = dict(self.overrides)
+
+        for name, value in fields.items():
+            overrides[name] = _REMOVED if value is None else value
+
+        return GlyphView(self.base, overrides)
+
+    def to_dict(self):
+        return copy.deepcopy(dict(self))
+
+class GlyphTable:
+    # One NumPy column per glyph field, rows are recycled through a free list and looked up by the composition's glyph ids.
+    def __init__(self, capacity = 256):
+        # Writers come from the GUI thread, the autosaver snapshots from its own thread.
+        self.lock = threading.RLock()
+        self.columns = {name: np.zeros((0,) + COLUMN_SHAPES.get(name, ()), dtype = dtype) for name, dtype in COLUMNS.items()}
+        self.capacity = 0
+        self.used = 0
+
+        self.rows = {}
+        self.row_keys = []
+        self.free = []
+
+        # Tracks and effect configs repeat a lot, so rows only hold small codes into these lists.
+        self.tracks = []
+        self._track_codes = {}
+        self.effects = []
+        self._effect_codes = {}
+
+        # Keys a glyph carries besides the columns above, kept so saves stay lossless.
+        self.extras = {}
+
+        # Segment lists the bitmask can't reproduce (unsorted or repeated), kept as written.
+        self.segment_order = {}
+
+        # Track code -> TrackIntervals, built on the first query of a track and patched by every write after that.
+        self.intervals = {}
+
+        # Bumped by every write, snapshots are reused until it changes.
+        self.version = 0
+        self._snapshot = None
+
+        self._grow(capacity)
+
+    def _grow(self, capacity):
+        capacity = max(capacity, 16)
+
+        for name, column in self.columns.items():
+            grown = np.zeros((capacity,) + COLUMN_SHAPES.get(name, ()), dtype = column.dtype)
+            grown[:self.capacity] = column[:self.capacity]
+            self.columns[name] = grown
+
+        self.columns["end_brightness"][self.capacity:] = np.nan
+        self.columns["effect"][self.capacity:] = -1
+        self.row_keys.extend([None] * (capacity - self.capacity))
+        self.capacity = capacity
+
+    def _alloc(self):
+        if self.free:
+            return self.free.pop()
+
+        if self.used == self.capacity:
+            self._grow(self.capacity * 2)
+
+        self.used += 1
+        return self.used - 1
+
+    def _track_code(self, track):
+        code = self._track_codes.get(track)
+
+        if code is None:
+            code = self._track_codes[track] = len(self.tracks)
+            self.tracks.append(track)
+
+        return code
+
+    def _effect_code(self, effect):
+        if effect is None:
+            return -1
+
+        signature = json.dumps(effect, sort_keys = True, default = str)
+        code = self._effect_codes.get(signature)
+
+        if code is None:
+            code = self._effect_codes[signature] = len(self.effects)
+            self.effects.append(copy.deepcopy(effect))
+
+        return code
+
+    def _mask(self, segments):
+        mask = 0
+
+        for segment in segments:
+            if not 0 <= segment < GLYPH_MAX_SEGMENTS:
+                raise ValueError(f"Segment {segment} does not fit into the glyph table")
+
+            mask |= 1 << int(segment)
+
+        return mask
+
+    # Rows - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+
+    def __len__(self):
+        return len(self.rows)
+
+    def __contains__(self, key):
+        return key in self.rows
+
+    def __iter__(self):
+        return iter(self.rows)
+
+    def set(self, key, glyph):
+        with self.lock:
+            self._set(key, glyph)
+
+    def _set(self, key, glyph):
+        # Everything that can fail runs before the row is touched, so a rejected glyph leaves the table as it was.
+        start = float(glyph["start"])
+        duration = float(glyph["duration"])
+        brightness = float(glyph["brightness"])
+        end_brightness = float(glyph["end_brightness"]) if "end_brightness" in glyph else np.nan
+        segments = glyph.get("segments")
+        mask = self._mask(segments or ())
+        extras = copy.deepcopy({name: value for name, value in glyph.items() if name not in COLUMNS})
+
+        track_code = self._track_code(glyph["track"])
+        effect_code = self._effect_code(glyph.get("effect"))
+
+        self.version += 1
+        row = self.rows.get(key)
+
+        if row is None:
+            row = self.rows[key] = self._alloc()
+            self.row_keys[row] = key
+
+        else:
+            self._unindex(key, row)
+
+        c = self.columns
+        c["start"][row] = start
+        c["duration"][row] = duration
+        c["track"][row] = track_code
+        c["brightness"][row] = brightness
+        c["end_brightness"][row] = end_brightness
+        c["effect"][row] = effect_code
+        c["has_segments"][row] = "segments" in glyph
+        c["segments"][row] = [mask >> (64 * i) & 0xFFFFFFFFFFFFFFFF for i in range(SEGMENT_WORDS)]
+        c["alive"][row] = True
+
+        if segments and list(segments) != self._segments_of(mask):
+            self.segment_order[row] = list(segments)
+
+        else:
+            self.segment_order.pop(row, None)
+
+        if extras:
+            self.extras[row] = extras
+
+        else:
+            self.extras.pop(row, None)
+
+        self._index(key, row)
+
+    def _segments_of(self, mask):
+        return [i for i in range(GLYPH_MAX_SEGMENTS) if mask >> i & 1]
+
+    def _mask_of(self, row):
+        return sum(int(word) << (64 * i) for i, word in enumerate(self.columns["segments"][row]))
+
+    def get(self, key):
+        row = self.rows.get(key)
+        return None if row is None else self.materialize(row)
+
+    def materialize(self, row):
+        c = self.columns
+        glyph = {
+            "track": self.tracks[c["track"][row]],
+            "start": _number(c["start"][row]),
+            "duration": _number(c["duration"][row]),
+            "brightness": _number(c["brightness"][row])
+        }
+
+        if not np.isnan(c["end_brightness"][row]):
+            glyph["end_brightness"] = _number(c["end_brightness"][row])
+
+        if c["has_segments"][row]:
+            order = self.segment_order.get(row)
+            glyph["segments"] = list(order) if order is not None else self._segments_of(self._mask_of(row))
+
+        if c["effect"][row] >= 0:
+            glyph["effect"] = copy.deepcopy(self.effects[c["effect"][row]])
+
+        if row in self.extras:
+            glyph.update(copy.deepcopy(self.extras[row]))
+
+        return glyph
+
+    def track(self, key):
+        row = self.rows.get(key)
+        return None if row is None else self.tracks[self.columns["track"][row]]
+
+    def has_effect(self, key):
+        return self.columns["effect"][self.rows[key]] >= 0
+
+    def delete(self, key):
+        with self.lock:
+            self._delete(key)
+
+    def _delete(self, key):
+        self.version += 1
+        row = self.rows.pop(key)
+
+        self._unindex(key, row)
+
+        self.columns["alive"][row] = False
+        self.columns["end_brightness"][row] = np.nan
+        self.columns["effect"][row] = -1
+        self.row_keys[row] = None
+        self.extras.pop(row, None)
+        self.segment_order.pop(row, None)
+        self.free.append(row)
+
+    def clear(self):
+        self.__init__(self.capacity)
+
+    # Interval index - - - - - - - - - - - - - - - - - - - - - - - -
+
+    def _span(self, row):
+        start = float(self.columns["start"][row])
+        return start, start + float(self.columns["duration"][row])
+
+    def _index(self, key, row):
+        intervals = self.intervals.get(self.columns["track"][row])
+
+        if intervals is not None:
+            intervals.add(key, *self._span(row))
+
+    def _unindex(self, key, row):
+        intervals = self.intervals.get(self.columns["track"][row])
+
+        if intervals is not None:
+            intervals.remove(key)
+
+    def _unindex_rows(self, keys, rows):
+        if len(rows) > INTERVAL_PATCH_LIMIT:
+            for code in np.unique(self.columns["track"][rows]).tolist():
+                self.intervals.pop(code, None)
+
+            return
+
+        for key, row in zip(keys, rows.tolist()):
+            self._unindex(key, row)
+
+    def _index_rows(self, keys, rows):
+        if len(rows) > INTERVAL_PATCH_LIMIT:
+            return
+
+        for key, row in zip(keys, rows.tolist()):
+            self._index(key, row)
+
+    def _intervals(self, code):
+        intervals = self.intervals.get(code)
+
+        if intervals is None:
+            c = self.columns
+            rows = np.flatnonzero(c["alive"][:self.used] & (c["track"][:self.used] == code))
+            rows = rows[np.argsort(c["start"][rows], kind = "stable")]
+            starts = c["start"][rows]
+
+            intervals = self.intervals[code] = TrackIntervals(
+                [self.row_keys[row] for row in rows.tolist()],
+                starts.tolist(),
+                (starts + c["duration"][rows]).tolist()
+            )
+
+        return intervals
+
+    def query(self, track, start, end):
+        # Keys on track overlapping [start, end), in start order.
+        with self.lock:
+            code = self._track_codes.get(track)
+
+            if code is None:
+                return []
+
+            return self._intervals(code).query(start, end)
+
+    # Vectorized queries - - - - - - - - - - - - - - - - - - - - - -
+
+    def _rows_of(self, keys):
+        return np.fromiter((self.rows[key] for key in keys), dtype = np.intp)
+
+    def _keys_of(self, mask):
+        return [self.row_keys[row] for row in np.flatnonzero(mask[:self.used])]
+
+    def keys_on_track(self, track):
+        # In start order.
+        with self.lock:
+            code = self._track_codes.get(track)
+
+            if code is None:
+                return []
+
+            return list(self._intervals(code).keys)
+
+    def keys_in_range(self, start, end):
+        # Glyphs overlapping [start, end).
+        c = self.columns
+        return self._keys_of(c["alive"] & (c["start"] < end) & (c["start"] + c["duration"] > start))
+
+    def keys_with_effect(self):
+        c = self.columns
+        return self._keys_of(c["alive"] & (c["effect"] >= 0))
+
+    def shift(self, keys, offset):
+        with self.lock:
+            self.version += 1
+            rows = self._rows_of(keys)
+
+            self._unindex_rows(keys, rows)
+            self.columns["start"][rows] += offset
+            self._index_rows(keys, rows)
+
+    def scale(self, keys, factor, origin = 0.0):
+        with self.lock:
+            self.version += 1
+            rows = self._rows_of(keys)
+            c = self.columns
+
+            self._unindex_rows(keys, rows)
+            c["start"][rows] = origin + (c["start"][rows] - origin) * factor
+            c["duration"][rows] *= factor
+            self._index_rows(keys, rows)
+
+    # Serialization - - - - - - - - - - - - - - - - - - - - - - - -
+
+    def to_dict(self):
+        return {key: self.materialize(row) for key, row in self.rows.items()}
+
+    def snapshot(self):
+        # key -> GlyphView, materialized once per table version and shared by every export / port until the next edit.
+        with self.lock:
+            if self._snapshot is None or self._snapshot[0] != self.version:
+                self._snapshot = (self.version, {key: GlyphView(self.materialize(row)) for key, row in self.rows.items()})
+
+            return types.MappingProxyType(self._snapshot[1])
+
+    def to_arrays(self):
+        with self.lock:
+            rows = np.fromiter(self.rows.values(), dtype = np.intp, count = len(self.rows))
+            arrays = {name: self.columns[name][rows] for name in COLUMNS if name != "alive"}
+
+            arrays["keys"] = list(self.rows)
+            arrays["tracks"] = list(self.tracks)
+            arrays["effects"] = copy.deepcopy(self.effects)
+            arrays["extras"] = {i: copy.deepcopy(self.extras[row]) for i, row in enumerate(rows.tolist()) if row in self.extras}
+            arrays["segment_order"] = {i: list(self.segment_order[row]) for i, row in enumerate(rows.tolist()) if row in self.segment_order}
+
+        return arrays
+
+    @classmethod
+    def from_arrays(cls, arrays):
+        count = len(arrays["keys"])
+        table = cls(count)
+
+        for name in COLUMNS:
+            if name not in ("alive", "segments"):
+                table.columns[name][:count] = arrays[name]
+
+        # Columns come back flat from project files, files written before the wider mask hold one word per glyph.
+        if count:
+            words = np.reshape(arrays["segments"], (count, -1))
+            table.columns["segments"][:count, :words.shape[1]] = words
+
+        table.columns["alive"][:count] = True
+        table.used = count
+
+        table.rows = {key: row for row, key in enumerate(arrays["keys"])}
+        table.row_keys[:count] = arrays["keys"]
+
+        table.tracks = list(arrays["tracks"])
+        table._track_codes = {track: code for code, track in enumerate(table.tracks)}
+        table.effects = list(arrays["effects"])
+        table._effect_codes = {json.dumps(effect, sort_keys = True, default = str): code for code, effect in enumerate(table.effects)}
+        table.extras = {int(row): extras for row, extras in arrays.get("extras", {}).items()}
+        table.segment_order = {int(row): list(order) for row, order in arrays.get("segment_order", {}).items()}
+
+        return table
+
+    @property
+    def nbytes(self):
+        return sum(column.nbytes for column in self.columns.values())
+
+def _benchmark(count, queries = 1000, tracks = 10, seed = 0):
+    rng = np.random.default_rng(seed)
+    table = GlyphTable()
+    glyphs = {}
+    length = count * 50.0
+
+    for key in range(count):
+        glyph = {
+            "track": str(rng.integers(1, tracks + 1)),
+            "start": float(rng.uniform(0, length)),
+            "duration": float(rng.uniform(10, 2000)),
+            "brightness": 100
+        }
+
+        glyphs[key] = glyph
+        table.set(key, glyph)
+
+    windows = [(str(rng.integers(1, tracks + 1)), float(a), float(a) + 1000.0) for a in rng.uniform(0, length, queries)]
+
+    def timed(fn):
+        started = time.perf_counter()
+        results = [fn(track, start, end) for track, start, end in windows]
+        return (time.perf_counter() - started) * 1000.0 / queries, results
+
+    def scan(track, start, end):
+        return [key for key, glyph in glyphs.items() if glyph["track"] == track and glyph["start"] < end and glyph["start"] + glyph["duration"] > start]
+
+    def vectorized(track, start, end):
+        c = table.columns
+        code = table._track_codes[track]
+        return table._keys_of(c["alive"] & (c["track"] == code) & (c["start"] < end) & (c["start"] + c["duration"] > start))
+
+    started = time.perf_counter()
+    for code in range(len(table.tracks)):
+        table._intervals(code)
+    build_ms = (time.perf_counter() - started) * 1000.0
+
+    index_ms, index_results = timed(table.query)
+    vector_ms, vector_results = timed(vectorized)
+    scan_ms, scan_results = timed(scan)
+
+    assert all(sorted(a) == sorted(b) == sorted(c) for a, b, c in zip(index_results, vector_results, scan_results))
+
+    started = time.perf_counter()
+    for key in range(min(count, 1000)):
+        table.set(key, dict(glyphs[key], start = glyphs[key]["start"] + 5))
+    update_us = (time.perf_counter() - started) * 1e6 / min(count, 1000)
+
+    print(
+        f"{count:>7} glyphs: build {build_ms:8.2f} ms | query index {index_ms:.4f} ms, "
+        f"numpy {vector_ms:.4f} ms, dict scan {scan_ms:.4f} ms | indexed update {update_us:.1f} us"
+    )
+
+if __name__ == "__main__":
+    for count in (10_000, 100_000):
+        _benchmark(count)
@@ -0,0 +1,151 @@
+import json
+import contextlib
+import collections
+
+from loguru import logger
+
+# Rough per - entry overhead of the dicts holding a step on top of the glyph payloads.
+ENTRY_OVERHEAD_BYTES = 200
+
+def _size(glyph):
+    if glyph is None:
+        return ENTRY_OVERHEAD_BYTES
+
+    return ENTRY_OVERHEAD_BYTES + len(json.dumps(glyph, default = str))
+
+class Step:
+    # Only the glyphs an edit touched: their value before and after it, None meaning the glyph did not exist.
+    def __init__(self, label):
+        self.label = label
+        self.before = {}
+        self.after = {}
+        self.nbytes = 0
+
+    def __bool__(self):
+        return bool(self.before)
+
+class History:
+    # Undo / redo over the inverse of batched glyph edits, trimmed from the oldest step once over the byte budget.
+    def __init__(self, glyphs, budget_bytes):
+        self.glyphs = glyphs
+        self.budget = budget_bytes
+
+        self.undo_steps = collections.deque()
+        self.redo_steps = []
+        self.nbytes = 0
+
+        self.current = None
+        self.depth = 0
+        self.replaying = False
+
+    @contextlib.contextmanager
+    def step(self, label = "Edit"):
+        # Nested steps fold into the outermost one, so a paste of many glyphs undoes at once.
+        if self.depth == 0:
+            self.current = Step(label)
+
+        self.depth += 1
+
+        try:
+            yield self.current
+
+        finally:
+            self.depth -= 1
+
+            if self.depth == 0:
+                step, self.current = self.current, None
+                self._commit(step)
+
+    def touch(self, keys):
+        # Called by the glyph map right before it changes keys, the first value seen per step is the one restored.
+        if self.replaying or self.current is None:
+            return
+
+        before = self.current.before
+
+        for key in keys:
+            if key not in before:
+                before[key] = self.glyphs.table.get(key)
+
+    def _commit(self, step):
+        if not step:
+            return
+
+        table = self.glyphs.table
+
+        for key, glyph in step.before.items():
+            step.after[key] = table.get(key)
+
+        # Edits that ended where they started (a drag released in place) are not worth a step.
+        for key in [key for key in step.before if step.before[key] == step.after[key]]:
+            del step.before[key]
+            del step.after[key]
+
+        if not step:
+            return
+
+        step.nbytes = sum(_size(glyph) for glyph in step.before.values()) + sum(_size(glyph) for glyph in step.after.values())
+
+        if step.nbytes > self.budget:
+            logger.debug(f"{step.label} step takes {step.nbytes} bytes, more than the whole history budget")
+
+        self.undo_steps.append(step)
+        self.nbytes += step.nbytes
+        self._clear_redo()
+        self._trim()
+
+    def _clear_redo(self):
+        self.nbytes -= sum(step.nbytes for step in self.redo_steps)
+        self.redo_steps.clear()
+
+    def _trim(self):
+        while self.undo_steps and self.nbytes > self.budget:
+            self.nbytes -= self.undo_steps.popleft().nbytes
+
+    def _replay(self, states):
+        self.replaying = True
+
+        try:
+            self.glyphs.restore(states)
+
+        finally:
+            self.replaying = False
+
+    def can_undo(self):
+        return bool(self.undo_steps)
+
+    def can_redo(self):
+        return bool(self.redo_steps)
+
+    def undo(self):
+        if not self.undo_steps:
+            return None
+
+        step = self.undo_steps.pop()
+        self._replay(step.before)
+        self.redo_steps.append(step)
+
+        return step
+
+    def redo(self):
+        if not self.redo_steps:
+            return None
+
+        step = self.redo_steps.pop()
+        self._replay(step.after)
+        self.undo_steps.append(step)
+
+        return step
+
+    def clear(self):
+        self.undo_steps.clear()
+        self.redo_steps.clear()
+        self.nbytes = 0
+
+    def get_metrics(self):
+        return {
+            "undo_steps": len(self.undo_steps),
+            "redo_steps": len(self.redo_steps),
+            "bytes": self.nbytes,
+            "budget": self.budget
+        }
@@ -291,6 +291,14 @@ class GlyphItem(QGraphicsObject):
 
         self.update()
     
+    def sync_with_glyph(self, glyph_data):
+        # Undo / redo can restore any field, so the track is re - read as well as the timing.
+        if glyph_data['track'] != self.track:
+            self.track = glyph_data['track']
+            self._fixed_y = self._calculate_y_pos()
+        
+        self.update_geometry(start_ms = glyph_data['start'], duration_ms = glyph_data['duration'])
+    
     # Animation Properties
 
     @pyqtProperty(float) # type: ignore
@@ -0,0 +1,202 @@
+import os
+import json
+import time
+import shutil
+import threading
+import traceback
+
+from PyQt5.QtCore import QObject, pyqtSignal
+
+from System import Utils
+from System import ProjectFormat
+
+from System.Constants import *
+from loguru import logger
+
+AUDIO_EXTENSIONS = ('.mp3', '.wav', '.ogg', '.flac')
+
+MANIFEST_VERSION = 2
+
+def _signature(save_path):
+    # Edits land in Save.journal until the next compaction, so it is part of the key next to the snapshot.
+    stat = os.stat(save_path)
+    signature = [stat.st_mtime_ns, stat.st_size]
+
+    try:
+        journal = os.stat(os.path.join(os.path.dirname(save_path), "Save.journal"))
+        signature += [journal.st_mtime_ns, journal.st_size]
+
+    except FileNotFoundError:
+        signature += [None, None]
+
+    return signature
+
+def locate(project_path):
+    audio_path = None
+
+    for entry in os.scandir(project_path):
+        if entry.name.lower().endswith(AUDIO_EXTENSIONS):
+            audio_path = entry.path
+
+    # Same pick as load_save, so the summary and its signature come from the file that is actually opened.
+    return audio_path, ProjectFormat.find_snapshot(project_path, CurrentSettings["binary_saves"])
+
+def summarize(audio_path, save_path):
+    entry = {
+        "audio_path": audio_path,
+        "save_path": save_path,
+        "signature": _signature(save_path)
+    }
+
+    try:
+        # Binary saves only need their metadata section read for the list.
+        if save_path.lower().endswith('.cass'):
+            save_data = ProjectFormat.read_meta(save_path)
+
+        else:
+            with open(save_path, 'r', encoding='utf-8') as f:
+                save_data = json.load(f)
+
+        entry.update({
+            "title": save_data["audio"]["title"],
+            "artist": save_data["audio"]["artist"],
+            "model": code_to_number_model(save_data["model"]),
+            "progress": save_data.get("progress", 0)
+        })
+
+    except Exception as e:
+        # Kept as broken so an unreadable save is not parsed again until it changes.
+        logger.warning(f"Can't read {save_path}: {e!r}")
+        entry["broken"] = True
+
+    return entry
+
+class Library(QObject):
+    # Main menu project summaries, cached in a manifest and only re-read when a save's or its journal's mtime or size changed.
+    entry_refreshed = pyqtSignal(str, object)
+    refresh_finished = pyqtSignal()
+
+    def __init__(self, songs_folder):
+        super().__init__()
+        self.songs_folder = songs_folder
+        self.path = Utils.get_cache_path("library.json")
+        self.lock = threading.Lock()
+
+        self.entries = self._load_manifest()
+        self._generation = 0
+
+    def _load_manifest(self):
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                manifest = json.load(f)
+
+            if manifest.get("version") == MANIFEST_VERSION:
+                return manifest["projects"]
+
+        except FileNotFoundError:
+            pass
+
+        except Exception:
+            logger.warning(f"Library manifest is unreadable, rebuilding: {traceback.format_exc()}")
+
+        return {}
+
+    def _save_manifest(self):
+        with self.lock:
+            manifest = {"version": MANIFEST_VERSION, "projects": dict(self.entries)}
+
+        tmp_path = f"{self.path}.tmp"
+
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(manifest, f, ensure_ascii=False)
+
+            os.replace(tmp_path, self.path)
+
+        except OSError:
+            logger.error(f"Failed to write the library manifest: {traceback.format_exc()}")
+
+    def scan(self):
+        # Cheap pass for the GUI thread: lists folders and stats saves. Returns the cached summaries and what needs re-reading.
+        os.makedirs(self.songs_folder, exist_ok=True)
+
+        projects = {}
+        stale = []
+        seen = set()
+
+        for project_name in os.listdir(self.songs_folder):
+            project_path = os.path.join(self.songs_folder, project_name)
+            if not os.path.isdir(project_path):
+                continue
+
+            audio_path, save_path = locate(project_path)
+
+            if not (audio_path and save_path):
+                logger.warning(f"Project '{project_name}' is missing audio or JSON file. Removing.")
+                shutil.rmtree(project_path)
+                continue
+
+            seen.add(project_name)
+            entry = self.entries.get(project_name)
+
+            try:
+                signature = _signature(save_path)
+
+            except OSError:
+                continue
+
+            if entry is None or entry["signature"] != signature or entry["save_path"] != save_path or entry["audio_path"] != audio_path:
+                stale.append((project_name, audio_path, save_path))
+
+            # Changed projects keep showing their last known summary until the refresh replaces it.
+            if entry is not None and not entry.get("broken"):
+                projects[project_name] = entry
+
+        with self.lock:
+            removed = [name for name in self.entries if name not in seen]
+
+            for name in removed:
+                del self.entries[name]
+
+        if removed and not stale:
+            self._save_manifest()
+
+        return projects, stale
+
+    def refresh(self, stale):
+        if not stale:
+            return
+
+        # A newer refresh supersedes a running one, which stops at its next project.
+        self._generation += 1
+
+        threading.Thread(
+            target = self._refresh,
+            args = (stale, self._generation),
+            name = "LibraryRefresh",
+            daemon = True
+        ).start()
+
+    def _refresh(self, stale, generation):
+        start = time.perf_counter()
+
+        for project_name, audio_path, save_path in stale:
+            if generation != self._generation:
+                return
+
+            try:
+                entry = summarize(audio_path, save_path)
+
+            except OSError:
+                # Deleted while refreshing, the next scan drops it.
+                continue
+
+            with self.lock:
+                self.entries[project_name] = entry
+
+            self.entry_refreshed.emit(project_name, None if entry.get("broken") else entry)
+
+        self._save_manifest()
+        logger.debug(f"Library refreshed {len(stale)} projects in {(time.perf_counter() - start) * 1000:.1f} ms")
+
+        self.refresh_finished.emit()
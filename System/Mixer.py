@@ -0,0 +1,199 @@
+import threading
+import traceback
+
+import numpy as np
+import sounddevice as sd
+
+from loguru import logger
+
+# Seconds without any source before the stream stops and the device is released.
+IDLE_CLOSE_S = 5.0
+
+class OutputMixer:
+    # Sources implement render(block, frames, time_info, status), write into block and return True when they produced audio.
+    def __init__(self, channels = 2, blocksize = 256, latency = "low"):
+        self.channels = channels
+        self.blocksize = blocksize
+        self.latency = latency
+        self._samplerate = None
+
+        self.stream = None
+        self.lock = threading.Lock()
+
+        self._sources = ()
+        self._idle_frames = 0
+        self._allocate(blocksize)
+
+    @property
+    def samplerate(self):
+        # Queried on first use, importing the module (effect pool workers do) never touches the audio device.
+        if self._samplerate is None:
+            self._samplerate = self._default_samplerate()
+
+        return self._samplerate
+
+    def _default_samplerate(self):
+        try:
+            return int(sd.query_devices(kind = "output")["default_samplerate"])
+
+        except Exception:
+            return 48000
+
+    def _allocate(self, frames):
+        self._mix = np.zeros((frames, self.channels), dtype = np.float32)
+        self._scratch = np.zeros((frames, self.channels), dtype = np.float32)
+
+    @property
+    def running(self):
+        stream = self.stream
+        return stream is not None and stream.active
+
+    def start(self):
+        with self.lock:
+            if self.running:
+                return
+
+            # A stream that stopped itself after idling is replaced, not restarted.
+            self._close()
+            self._allocate(self.blocksize)
+            self._idle_frames = 0
+
+            stream = sd.OutputStream(
+                samplerate = self.samplerate,
+                channels = self.channels,
+                blocksize = self.blocksize,
+                latency = self.latency,
+                callback = self._callback,
+                finished_callback = lambda: self._on_finished(stream)
+            )
+
+            self.stream = stream
+            self.stream.start()
+
+        logger.debug(f"Output mixer started: {self.samplerate} Hz, block {self.blocksize}, latency {self.latency}")
+
+    def close(self):
+        with self.lock:
+            self._close()
+
+    def _close(self):
+        if self.stream is None:
+            return
+
+        try:
+            self.stream.abort()
+            self.stream.close()
+
+        except Exception:
+            logger.error(f"Error while closing the output mixer: {traceback.format_exc()}")
+
+        self.stream = None
+        logger.debug("Output mixer stopped")
+
+    def configure(self, blocksize, latency):
+        if blocksize == self.blocksize and latency == self.latency:
+            return
+
+        running = self.running
+        self.close()
+
+        self.blocksize = blocksize
+        self.latency = latency
+
+        if running:
+            self.start()
+
+    def register(self, source, gain = 1.0, transient = False, wait = True):
+        # Transient sources implement idle() and are dropped by the mixer once they stop producing audio.
+        with self.lock:
+            if not any(entry[0] is source for entry in self._sources):
+                self._sources = self._sources + ([source, float(gain), transient],)
+
+        if self.running:
+            return
+
+        if wait:
+            self.start()
+
+        else:
+            threading.Thread(target = self.start, name = "MixerStart", daemon = True).start()
+
+    def unregister(self, source):
+        # With no sources left the callback stops the stream after IDLE_CLOSE_S.
+        with self.lock:
+            self._sources = tuple(entry for entry in self._sources if entry[0] is not source)
+
+    def _on_finished(self, stream):
+        # Runs on the audio thread when the stream stops, the device is closed from a helper thread instead.
+        threading.Thread(target = self._release, args = (stream,), name = "MixerRelease", daemon = True).start()
+
+    def _release(self, stream):
+        with self.lock:
+            if self.stream is not stream:
+                return
+
+            if not self._sources:
+                self._close()
+                return
+
+        # A source registered while the idle stream was stopping.
+        self.start()
+
+    def set_gain(self, source, gain):
+        for entry in self._sources:
+            if entry[0] is source:
+                entry[1] = float(gain)
+
+    @property
+    def time(self):
+        stream = self.stream
+        return stream.time if stream else None
+
+    @property
+    def output_latency(self):
+        stream = self.stream
+        return stream.latency if stream else 0.0
+
+    def _callback(self, outdata, frames, time_info, status):
+        if frames > self._mix.shape[0]:
+            self._allocate(frames)
+
+        mix = self._mix[:frames]
+        scratch = self._scratch[:frames]
+        mix.fill(0)
+        finished = False
+
+        for source, gain, transient in self._sources:
+            try:
+                if source.render(scratch, frames, time_info, status):
+                    if gain:
+                        scratch *= gain
+                        mix += scratch
+
+                elif transient:
+                    finished = True
+
+            except Exception:
+                logger.error(f"Mixer source {type(source).__name__} failed: {traceback.format_exc()}")
+
+        # Never wait for the lock here, a busy lock just retries the drop on the next block.
+        if finished and self.lock.acquire(blocking = False):
+            try:
+                self._sources = tuple(entry for entry in self._sources if not (entry[2] and entry[0].idle()))
+
+            finally:
+                self.lock.release()
+
+        if self._sources:
+            self._idle_frames = 0
+
+        else:
+            self._idle_frames += frames
+
+        np.clip(mix, -1.0, 1.0, out = mix)
+        outdata[:] = mix
+
+        if self._idle_frames > self.samplerate * IDLE_CLOSE_S:
+            raise sd.CallbackStop
+
+mixer = OutputMixer()
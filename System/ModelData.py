@@ -0,0 +1,9 @@
+# Plain model tables with no Qt or audio imports, so effect pool workers can load them.
+ModelSegments = {
+    "PHONE1": {"7": 8},
+    "PHONE2": {"4": 16, "10": 8},
+    "PHONE2A": {"1": 24},
+    "PHONE3A": {"1": 20, "2": 11, "3": 5},
+}
+
+GLYPH_MAX_SEGMENTS = 256
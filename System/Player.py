@@ -1,16 +1,19 @@
 import time
 import math
+import bisect
 import traceback
 import threading
+import collections
 
 import numpy as np
 import soundfile as sf
-import sounddevice as sd
 
 from loguru import logger
 
 from PyQt5.QtCore import *
 from System.Constants import *
+from System import DSP
+from System.Mixer import mixer
 
 def thread_excepthook(args):
     logger.exception(
@@ -20,90 +23,135 @@ def thread_excepthook(args):
 
 threading.excepthook = thread_excepthook
 
-class FastUISound:
-    def __init__(self, path, loop=False):
-        self.data, self.fs = sf.read(path, dtype='float32')
-        if self.data.ndim == 1:
-            self.data = np.stack([self.data, self.data], axis=-1)
-
-        self.loop = loop
-        self.position = 0.0
-        self.speed = 1.0
-        self.volume = 1.0
+class AudioClock:
+    def __init__(self):
         self.lock = threading.Lock()
-        self.is_playing = False
+        self.reset(0.0)
 
-        self.stream = sd.OutputStream(
-            samplerate=self.fs,
-            channels=self.data.shape[1],
-            blocksize=128,
-            callback=self._callback,
-            latency='low'
-        )
-        self.stream.start()
+    def reset(self, position_ms, running = False):
+        with self.lock:
+            self._anchor_ms = float(position_ms)
+            self._block_ms = float(position_ms)
+            self._block_speed = 1.0
+            self._dac_time = None
+            self._monotonic = False
+            self._running = running
+
+    def publish(self, position_samples, fs, speed, dac_time, monotonic = False):
+        with self.lock:
+            if not self._running:
+                return
 
-    def _callback(self, outdata, frames, time_info, status):
-        if not self.is_playing:
-            outdata.fill(0)
-            return
+            self._block_ms = position_samples * 1000.0 / fs
+            self._block_speed = speed
+            self._dac_time = dac_time
+            self._monotonic = monotonic
+
+    def uses_monotonic(self):
+        return self._monotonic
 
+    def position_ms(self, now):
         with self.lock:
-            pos = self.position + np.arange(frames) * self.speed
-            idx_int = np.floor(pos).astype(int)
-            idx_frac = pos - idx_int
-            idx_int = np.clip(idx_int, 0, len(self.data) - 2)
+            if not self._running or self._dac_time is None or now is None:
+                return self._anchor_ms
 
-            s0 = self.data[idx_int]
-            s1 = self.data[idx_int + 1]
-            outdata[:] = ((1 - idx_frac)[:, None] * s0 + idx_frac[:, None] * s1) * self.volume
+            elapsed = now - self._dac_time
+            position = self._block_ms + elapsed * 1000.0 * self._block_speed
 
-            self.position += frames * self.speed
+            return max(self._anchor_ms, position)
 
-            if self.position >= len(self.data):
-                if self.loop:
-                    self.position %= len(self.data)
-                
-                else:
-                    outdata.fill(0)
-                    raise sd.CallbackStop()
+class AudioStats:
+    # Upper edges of the histogram bins as a fraction of the block budget, the last bin collects everything above.
+    bins = (0.25, 0.5, 0.75, 1.0, 1.5)
+
+    def __init__(self, window = 2048):
+        self.lock = threading.Lock()
+        self.window = window
+        self.reset(256, 44100)
 
-    def play(self, speed=1.0, volume=1.0):
+    def reset(self, blocksize, fs):
         with self.lock:
-            self.speed = speed
-            self.volume = volume
-            self.position = 0.0
-            self.is_playing = True
+            self.blocksize = blocksize
+            self.fs = fs
+            self.budget = blocksize / float(fs) if fs else 0.0
 
-    def stop(self):
-        self.is_playing = False
+            self.loads = collections.deque(maxlen = self.window)
+            self.histogram = [0] * (len(self.bins) + 1)
+
+            self.callbacks = 0
+            self.underflows = 0
+            self.overflows = 0
+            self.late_blocks = 0
+            self.max_wall = 0.0
+            self.max_lock_wait = 0.0
+
+    def record(self, wall, lock_wait, status):
+        load = wall / self.budget if self.budget else 0.0
+
+        with self.lock:
+            if len(self.loads) == self.loads.maxlen:
+                self.histogram[bisect.bisect_left(self.bins, self.loads[0])] -= 1
+
+            self.loads.append(load)
+            self.histogram[bisect.bisect_left(self.bins, load)] += 1
+
+            self.callbacks += 1
+            self.late_blocks += load > 1.0
+            self.max_wall = max(self.max_wall, wall)
+            self.max_lock_wait = max(self.max_lock_wait, lock_wait)
+
+            if status:
+                self.underflows += bool(status.output_underflow or status.input_underflow)
+                self.overflows += bool(status.output_overflow or status.input_overflow)
+
+    def snapshot(self):
+        with self.lock:
+            loads = list(self.loads)
+
+            return {
+                "blocksize": self.blocksize,
+                "samplerate": self.fs,
+                "budget_ms": self.budget * 1000.0,
+                "callbacks": self.callbacks,
+                "underflows": self.underflows,
+                "overflows": self.overflows,
+                "late_blocks": self.late_blocks,
+                "avg_load": sum(loads) / len(loads) if loads else 0.0,
+                "peak_load": max(loads) if loads else 0.0,
+                "max_wall_ms": self.max_wall * 1000.0,
+                "max_lock_wait_ms": self.max_lock_wait * 1000.0,
+                "histogram": dict(zip([f"<={edge:g}" for edge in self.bins] + [f">{self.bins[-1]:g}"], self.histogram))
+            }
 
 class PlaybackManager(QObject):
     playback_state_changed = pyqtSignal(bool)
+    speed_changed = pyqtSignal(float)
     audio_loaded = pyqtSignal(np.ndarray, int, float)
+    reached_end = pyqtSignal()
     
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
 
         self.is_playing = False
-        self.playback_start_audio_ms = 0
-        self.playback_start_wall_time = 0 # Why do I use this? Because some players update their UI 120 frames per second. And for smoothness we need smooth timing.
+        self._end_pending = False
+        self.clock = AudioClock() # Playhead comes from the samples the sound card is actually playing, not from wall time.
         
         self.thread = None
         self.stream = None
         self.lock = threading.RLock()
 
-        self._delay_timer = QTimer()
-        self._mid_timer = QTimer()
-        self._bc_timer = QTimer()
+        self.dsp = None
+        self.blocksize = 256
+        self.stats = AudioStats()
+
         self._speed_timer = QTimer()
         self._volume_timer = QTimer()
         
-        self._delay_timer.timeout.connect(self._delay_tick)
-        self._mid_timer.timeout.connect(self._midpass_tick)
-        self._bc_timer.timeout.connect(self._bitcrush_tick)
         self._speed_timer.timeout.connect(self._speed_tick)
         self._volume_timer.timeout.connect(self._volume_tick)
-        self._mid_timer.timeout.connect(self._midpass_tick)
+
+        # Emitted from the audio callback, queued so stop() and its signals run on the GUI thread.
+        self.reached_end.connect(self._finish_at_end, Qt.QueuedConnection)
     
     def _setup_parameters(self):
         self.fade_factor = 1.0
@@ -115,36 +163,16 @@ class PlaybackManager(QObject):
         self.fs = None
 
         self.cleanup_on_finished = False
+        self._end_pending = False
 
-        self.midpass_enabled = False
-        self.midpass_center = 1000.0
-        self.midpass_q = 1.0
-        self.midpass_gain = 1.0
-        self.midpass_mix = 0.0
-        self._b = [1.0, 0.0, 0.0]
-        self._a = [1.0, 0.0]
-        self._filter_states = None
-
-        self.bitcrush_enabled = False
-        self._bitcrush_bits = 16
-        self._bitcrush_downsample = 1
-        self._bitcrush_mix = 0.0
-
-        self._bc_steps = 0
-        self._bc_step = 0
-        self._bc_start = None
-        self._bc_target = None
-        self._bitcrush_state = None
-
-        self._channel_delays_ms = np.array([0.0, 0.0], dtype='float64')
-        self._delay_steps = 0
-        self._delay_step = 0
-        self._delay_start = np.array([0.0, 0.0], dtype='float64')
-        self._delay_target = np.array([0.0, 0.0], dtype='float64')
+        self.dsp = None
+        self.output_fs = mixer.samplerate
 
         self._track_peak_level = 1.0 
         self._current_audio_level = 0.0
 
+        self.clock.reset(0.0)
+
     def load_audio(self, path):
         try:
             if self.stream:
@@ -187,115 +215,68 @@ class PlaybackManager(QObject):
             logger.error(f"Error initializing from data: {traceback.format_exc()}")
 
     def _open_stream(self):
-        self.stream = sd.OutputStream(
-            channels = self.data.shape[1],
-            samplerate = self.fs,
-            blocksize = 256,
-            latency = "low",
-            callback = self.audio_callback
-        )
+        mixer.configure(int(CurrentSettings["audio_blocksize"]), CurrentSettings["audio_latency"])
+
+        self.data = self.data[:, :mixer.channels]
+        self.blocksize = mixer.blocksize
+        self.output_fs = mixer.samplerate
+
+        self.stats.reset(self.blocksize, self.output_fs)
         
         max_abs = np.max(np.abs(self.data))
         with self.lock:
             self._track_peak_level = max(max_abs, 1e-6)
-            channels = self.data.shape[1]
-            self._filter_states = np.zeros((channels, 4), dtype='float64')
+            self.dsp = DSP.EffectChain(
+                mixer.channels,
+                self.output_fs,
+                self.blocksize,
+                [DSP.ChannelDelayNode, DSP.MidpassNode, DSP.BitcrushNode]
+            )
         
-        self.stream.start()
+        # Playback is a source on the shared output mixer, it no longer owns a device stream.
+        self.stream = mixer
+        mixer.register(self)
 
     def smooth_channel_delay(self, left_from_ms = None, left_to_ms = None, right_from_ms = None, right_to_ms = None, duration = 0.5, steps = 50):
-        if left_from_ms is None:
-            left_from_ms = self._channel_delays_ms[0]
-        
-        if left_to_ms is None:
-            left_to_ms = self._channel_delays_ms[0]
-        
-        if right_from_ms is None:
-            right_from_ms = self._channel_delays_ms[1]
-        
-        if right_to_ms is None:
-            right_to_ms = self._channel_delays_ms[1]
-        
-        steps = max(1, int(steps))
-        duration = max(0.0, float(duration))
-
-        if duration == 0.0 or steps <= 1:
-            with self.lock:
-                self._channel_delays_ms[0] = max(0.0, float(left_to_ms))
-                self._channel_delays_ms[1] = max(0.0, float(right_to_ms))
-            
+        if self.dsp is None:
             return
 
-        with self.lock:
-            self._delay_start = np.array([max(0.0, float(left_from_ms)), max(0.0, float(right_from_ms))], dtype='float64')
-            self._delay_target = np.array([max(0.0, float(left_to_ms)), max(0.0, float(right_to_ms))], dtype='float64')
-
-            self._delay_steps = steps
-            self._delay_step = 0
+        delay = self.dsp["delay"]
 
-        interval_ms = max(1, int((duration / float(self._delay_steps)) * 1000.0))
+        if left_from_ms is not None or right_from_ms is not None:
+            delay.set(
+                left_ms = max(0.0, float(left_from_ms if left_from_ms is not None else delay.get("left_ms"))),
+                right_ms = max(0.0, float(right_from_ms if right_from_ms is not None else delay.get("right_ms")))
+            )
 
-        self._delay_timer.stop()
-        self._delay_timer.setInterval(interval_ms)
-        self._delay_timer.start()
-    
-    def _delay_tick(self):
-        i = self._delay_step
-        steps = self._delay_steps
-
-        if i >= steps:
-            with self.lock:
-                self._channel_delays_ms[:] = self._delay_target
-            
-            self._delay_timer.stop()
-            return
+        targets = {}
 
-        if steps > 1:
-            t = float(i) / float(steps - 1)
-        
-        else:
-            t = 1.0
+        if left_to_ms is not None:
+            targets["left_ms"] = max(0.0, float(left_to_ms))
         
-        eased = t * t * (3.0 - 2.0 * t)
-        new = self._delay_start + (self._delay_target - self._delay_start) * eased
+        if right_to_ms is not None:
+            targets["right_ms"] = max(0.0, float(right_to_ms))
 
-        with self.lock:
-            self._channel_delays_ms[:] = new
+        if targets:
+            delay.set(duration = max(0.0, float(duration)), **targets)
 
-        self._delay_step += 1
+    def _clock_now(self):
+        if self.clock.uses_monotonic():
+            return time.monotonic()
 
-    def _compute_biquad_bandpass(self, center_hz, q):
-        fs = float(self.fs)
-        if fs is None or fs <= 0:
-            return (1.0, 0.0, 0.0), (0.0, 0.0)
+        try:
+            return self.stream.time if self.stream else None
         
-        omega = 2.0 * math.pi * (center_hz / fs)
-        sn = math.sin(omega)
-        cs = math.cos(omega)
-        alpha = sn / (2.0 * q)
-
-        b0 = alpha
-        b1 = 0.0
-        b2 = -alpha
-        a0 = 1.0 + alpha
-        a1 = -2.0 * cs
-        a2 = 1.0 - alpha
-
-        b0 /= a0
-        b1 /= a0
-        b2 /= a0
-        a1 /= a0
-        a2 /= a0
-
-        return (b0, b1, b2), (a1, a2)
+        except Exception:
+            return None
 
     def get_position_ms(self):
-        elapsed_ms = (time.time() - self.playback_start_wall_time) * 1000
-        return self.playback_start_audio_ms + elapsed_ms * self.speed
+        position = self.clock.position_ms(self._clock_now())
+        
+        if self.duration_ms:
+            position = min(position, self.duration_ms)
 
-    def _update_playback_start(self):
-        self.playback_start_audio_ms = self.get_position_ms()
-        self.playback_start_wall_time = time.time()
+        return position
     
     def toggle_playback(self, ms = None):
         if self.is_playing:
@@ -307,26 +288,34 @@ class PlaybackManager(QObject):
     def stop(self):        
         with self.lock:
             self.is_playing = False
+            self._end_pending = False
 
+        self.clock.reset(self.get_position_ms())
         self.playback_state_changed.emit(False)
+
+    def _finish_at_end(self):
+        # Skipped when play() or stop() already ran after the track ended.
+        if self._end_pending:
+            self.stop()
     
     def play(self, start_pos_ms):
-        self.playback_state_changed.emit(True)
-        
         with self.lock:
             self.position = int(start_pos_ms * self.fs / 1000)
+            self.clock.reset(start_pos_ms, running = True)
             self.is_playing = True
+            self._end_pending = False
+
+            if self.dsp:
+                self.dsp.reset()
         
-        self.playback_start_audio_ms = start_pos_ms
-        self.playback_start_wall_time = time.time()
+        self.playback_state_changed.emit(True)
     
     def set_speed(self, new_speed, steps = 50, duration = 0.0, stop_on_end = False):
-        self._update_playback_start()
-
         if duration == 0.0:
             with self.lock:
                 self.speed = new_speed
             
+            self.speed_changed.emit(new_speed)
             return
         
         interval = duration / steps
@@ -357,142 +346,75 @@ class PlaybackManager(QObject):
         self._volume_timer.setInterval(int(interval * 1000))
         self._volume_timer.start()
 
-    def audio_callback(self, outdata, frames, time_info, status):
-        if status:
-            logger.warning(f"Audio callback status: {status}")
+    def render(self, block, frames, time_info, status):
+        callback_start = time.perf_counter()
+        lock_wait = 0.0
 
         try:
             with self.lock:
+                lock_wait = time.perf_counter() - callback_start
+
                 if not self.is_playing or self.data is None:
-                    outdata.fill(0)
-                    return
+                    return False
                 
-                pos = self.position + np.arange(frames) * self.speed
+                self._publish_clock(frames, time_info)
+                
+                # Source samples advanced per output frame, the mixer may run at a different rate than the track.
+                step = self.speed * self.fs / self.output_fs
+                pos = self.position + np.arange(frames) * step
                 fade = self.fade_factor
                 local_volume = self.volume
-                do_mid = self.midpass_enabled
-
-                b = tuple(self._b)
-                a1, a2 = tuple(self._a)
-                mix = self.midpass_mix
-                gain = self.midpass_gain
-
-                do_bit = self.bitcrush_enabled
-                bc_bits = int(max(1, min(24, self._bitcrush_bits)))
-                bc_down = max(1, int(self._bitcrush_downsample))
-                bc_mix = float(max(0.0, min(1.0, self._bitcrush_mix)))
-                bc_state = None if self._bitcrush_state is None else self._bitcrush_state.copy()
-
-                states = None if self._filter_states is None else self._filter_states.copy()
-
-                delays_ms = None if self._channel_delays_ms is None else self._channel_delays_ms.copy()
+                dsp = self.dsp
+                data = self.data
 
-            idx_int = None
-            idx_frac = None
+            max_index = len(data) - 1
 
-            channels = self.data.shape[1]
-
-            if delays_ms is None:
-                delays_samples = np.zeros(channels, dtype='float64')
-
-            else:
-                delays_samples = (delays_ms.astype('float64') * (float(self.fs) / 1000.0))
-
-            pos2 = pos[:, None] - delays_samples[None, :]
-
-            idx_int = np.floor(pos2).astype(int)
-            idx_frac = pos2 - idx_int
-
-            temp = np.zeros((frames, channels), dtype=self.data.dtype)
-            max_index = len(self.data) - 1
-
-            for ch in range(channels):
-                idxi = idx_int[:, ch]
-                frac = idx_frac[:, ch]
-
-                mask_before = idxi < 0
-                mask_after = idxi >= max_index
-                mask_valid = ~(mask_before | mask_after)
-
-                if np.any(mask_valid):
-                    ii = idxi[mask_valid]
-                    f = frac[mask_valid]
-
-                    ii_clip = np.clip(ii, 0, max_index - 1)
-                    s0 = self.data[ii_clip, ch]
-                    s1 = self.data[ii_clip + 1, ch]
-
-                    temp[mask_valid, ch] = (1.0 - f) * s0 + f * s1
-
-                if np.any(mask_after):
-                    temp[mask_after, ch] = self.data[max_index, ch]
-
-            if do_mid and states is not None:
-                filtered = np.empty_like(temp)
-                channels = temp.shape[1]
-                b0, b1, b2 = b
-
-                for n in range(frames):
-                    for ch in range(channels):
-                        x_n = float(temp[n, ch])
-                        x1, x2, y1, y2 = states[ch]
-                        y_n = b0 * x_n + b1 * x1 + b2 * x2 - a1 * y1 - a2 * y2
-
-                        states[ch, 1] = x1
-                        states[ch, 0] = x_n
-                        states[ch, 3] = y1
-                        states[ch, 2] = y_n
-
-                        filtered[n, ch] = y_n
-
-                temp = (1.0 - mix) * temp + mix * filtered * gain
-
-                with self.lock:
-                    if self._filter_states is not None:
-                        self._filter_states[:, :] = states
-
-            if do_bit and bc_state is not None and (bc_mix > 0.0):
-                channels = temp.shape[1]
-                frames_n = temp.shape[0]
-
-                bits = max(1, min(24, bc_bits))
-                levels = float((1 << bits) - 1)
-
-                for n in range(frames_n):
-                    for ch in range(channels):
-                        cnt = int(bc_state[ch, 1])
+            idx_int = np.floor(pos).astype(int)
+            idx_frac = (pos - idx_int).astype(np.float32)[:, None]
+            
+            valid = idx_int < max_index
+            ii = np.minimum(idx_int, max_index - 1)
 
-                        if cnt <= 0:
-                            v = float(temp[n, ch])
-                            bc_state[ch, 0] = v
-                            bc_state[ch, 1] = bc_down - 1
+            np.multiply(data[ii], 1.0 - idx_frac, out = block)
+            block += data[ii + 1] * idx_frac
+            block[~valid] = data[max_index]
 
-                        else:
-                            v = float(bc_state[ch, 0])
-                            bc_state[ch, 1] = cnt - 1
+            dsp.process(block)
 
-                        q = round(((v + 1.0) * 0.5) * levels) / levels
-                        vq = q * 2.0 - 1.0
+            peak_amplitude_block = np.max(np.abs(block))
+            block *= fade * local_volume
 
-                        temp[n, ch] = (1.0 - bc_mix) * temp[n, ch] + bc_mix * vq
+            with self.lock:
+                self._current_audio_level = peak_amplitude_block / self._track_peak_level
+                self.position += frames * step
 
-                with self.lock:
-                    if self._bitcrush_state is not None:
-                        self._bitcrush_state[:, :] = bc_state
+                at_end = self.position >= len(data)
 
-            outdata[:] = temp * fade * local_volume
-            peak_amplitude_block = np.max(np.abs(temp)) 
+                # Later blocks are silent right away, the rest of the stop waits for the GUI thread.
+                if at_end:
+                    self.is_playing = False
+                    self._end_pending = True
 
-            with self.lock:
-                self._current_audio_level = peak_amplitude_block / self._track_peak_level
+            if at_end:
+                self.reached_end.emit()
 
-            with self.lock:
-                self.position += frames * self.speed
-                if self.position >= len(self.data):
-                    self.stop()
+            return True
         
         except Exception as e:
             logger.error(f"Failed to play the audio block: {traceback.format_exc()}")
+            return False
+        
+        finally:
+            self.stats.record(time.perf_counter() - callback_start, lock_wait, status)
+
+    def _publish_clock(self, frames, time_info):
+        dac_time = getattr(time_info, "outputBufferDacTime", 0.0)
+        monotonic = not dac_time
+
+        if monotonic:
+            dac_time = time.monotonic() + (self.stream.output_latency if self.stream else 0.0)
+
+        self.clock.publish(self.position, self.fs, self.speed, dac_time, monotonic)
 
     def get_current_audio_level(self):
         with self.lock:
@@ -522,154 +444,70 @@ class PlaybackManager(QObject):
         self.set_speed(end_speed if end_speed is not None else self.speed, steps, duration)
     
     def set_channel_delay_ms(self, left_ms: float, right_ms: float):
-        with self.lock:
-            self._channel_delays_ms[0] = float(left_ms)
-            self._channel_delays_ms[1] = float(right_ms)
+        if self.dsp:
+            self.dsp["delay"].set(left_ms = max(0.0, float(left_ms)), right_ms = max(0.0, float(right_ms)))
     
     def enable_bitcrush(self, bits = 8, downsample = 4, mix = 1.0, duration = 0.0, steps = 50):
-        with self.lock:
-            if self._bitcrush_state is None and self.data is not None:
-                channels = self.data.shape[1]
-                self._bitcrush_state = np.zeros((channels, 2), dtype='float64')
-
-            if duration == 0.0 or steps <= 0:
-                self._bitcrush_bits = bits
-                self._bitcrush_downsample = downsample
-                self._bitcrush_mix = mix
-
-                self.bitcrush_enabled = True
-                return
-
-            self._bc_start = {
-                "bits": float(self._bitcrush_bits),
-                "down": float(self._bitcrush_downsample),
-                "mix": float(self._bitcrush_mix)
-            }
-
-            self._bc_target = {
-                "bits": float(bits),
-                "down": float(max(1, int(downsample))),
-                "mix": float(max(0.0, min(1.0, mix)))
-            }
-
-            self._bc_steps = max(1, int(steps))
-            self._bc_step = 0
-
-            self.bitcrush_enabled = True
-
-        interval_ms = max(1, int((duration / self._bc_steps) * 1000))
+        if self.dsp is None:
+            return
 
-        self._bc_timer.stop()
-        self._bc_timer.setInterval(interval_ms)
-        self._bc_timer.start()
+        self.dsp["bitcrush"].set(
+            duration = duration if steps > 0 else 0.0,
+            bits = bits,
+            downsample = max(1, int(downsample)),
+            mix = max(0.0, min(1.0, mix))
+        )
     
-    def enable_midpass(self, center_hz = 1000.0, q = 1.0, mix = 1.0, gain = 1.0, duration = 0.0, steps=50):
-        with self.lock:
-            if duration == 0.0 or steps <= 0:
-                self.midpass_enabled = True
-                self.midpass_center = float(center_hz)
-                self.midpass_q = float(q)
-                self.midpass_mix = float(min(max(mix, 0.0), 1.0))
-                self.midpass_gain = float(gain)
-                self._b, self._a = self._compute_biquad_bandpass(self.midpass_center, self.midpass_q)
-
-                return
-
-            self._mid_target = {
-                "center": float(center_hz),
-                "q": float(q),
-                "mix": float(max(0.0, min(mix, 1.0))),
-                "gain": float(gain)
-            }
-
-            self._mid_start = {
-                "center": float(self.midpass_center),
-                "q": float(self.midpass_q),
-                "mix": float(self.midpass_mix),
-                "gain": float(self.midpass_gain)
-            }
-
-            self._mid_steps = max(1, int(steps))
-            self._mid_step = 0
-            interval_ms = max(1, int((duration / self._mid_steps) * 1000))
-
-            self._b, self._a = self._compute_biquad_bandpass(self.midpass_center, self.midpass_q)
-
-            if self._filter_states is None and self.data is not None:
-                channels = self.data.shape[1]
-                self._filter_states = np.zeros((channels, 4), dtype='float64')
-
-            self.midpass_enabled = True
+    def enable_midpass(self, center_hz = 1000.0, q = 1.0, mix = 1.0, gain = 1.0, duration = 0.0, steps = 50):
+        if self.dsp is None:
+            return
 
-            self._mid_timer.stop()
-            self._mid_timer.setInterval(interval_ms)
-            self._mid_timer.start()
+        self.dsp["midpass"].set(
+            duration = duration if steps > 0 else 0.0,
+            center = center_hz,
+            q = max(0.001, q),
+            mix = max(0.0, min(mix, 1.0)),
+            gain = gain
+        )
 
     def disable_bitcrush(self, duration = 0.0, steps = 50):
-        with self.lock:
-            if not self.bitcrush_enabled:
-                return
-            
-            if duration == 0.0 or steps <= 0:
-                self._bitcrush_bits = 24.0
-                self._bitcrush_downsample = 1.0
-                self._bitcrush_mix = 0.0
-
-                self.bitcrush_enabled = False
-                return
-
-            self._bc_start = {
-                "bits": float(self._bitcrush_bits),
-                "down": float(self._bitcrush_downsample),
-                "mix": float(self._bitcrush_mix)
-            }
-
-            self._bc_target = {
-                "bits": 24.0,
-                "down": 1.0,
-                "mix": 0.0
-            }
-
-            self._bc_steps = steps
-            self._bc_step = 0
-
-        interval_ms = max(1, int((duration / self._bc_steps) * 1000))
+        if self.dsp is None:
+            return
 
-        self._bc_timer.stop()
-        self._bc_timer.setInterval(interval_ms)
-        self._bc_timer.start()
+        self.dsp["bitcrush"].set(
+            duration = duration if steps > 0 else 0.0,
+            bits = 24.0,
+            downsample = 1.0,
+            mix = 0.0
+        )
     
     def disable_midpass(self, duration = 0.0, steps = 50):
+        if self.dsp is None:
+            return
+
         if duration == 0:
-            with self.lock:
-                self.midpass_enabled = False
-                if self._filter_states is not None:
-                    self._filter_states.fill(0.0)
-            
+            self.dsp["midpass"].set(mix = 0.0, reset_state = True)
             return
 
-        with self.lock:
-            self._mid_target = {
-                "center": float(self.midpass_center),
-                "q": float(self.midpass_q),
-                "mix": 0.0,
-                "gain": 0.0
-            }
+        self.dsp["midpass"].set(duration = duration, mix = 0.0, gain = 0.0)
 
-            self._mid_start = {
-                "center": float(self.midpass_center),
-                "q": float(self.midpass_q),
-                "mix": float(self.midpass_mix),
-                "gain": float(self.midpass_gain)
-            }
+    def get_dsp_stats(self):
+        return self.dsp.get_stats() if self.dsp else {}
 
-            self._mid_steps = max(1, int(steps))
-            self._mid_step = 0
-            interval_ms = max(1, int((duration / self._mid_steps) * 1000))
+    def get_audio_stats(self):
+        stats = self.stats.snapshot()
 
-            self._mid_timer.stop()
-            self._mid_timer.setInterval(interval_ms)
-            self._mid_timer.start()
+        try:
+            stats["latency_ms"] = self.stream.output_latency * 1000.0 if self.stream else None
+        
+        except Exception:
+            stats["latency_ms"] = None
+
+        # The track is fully decoded into memory before playback, so there is no streaming ring buffer to report.
+        stats["ring_fill"] = None
+        stats["dsp"] = self.get_dsp_stats()
+
+        return stats
     
     def _volume_tick(self):
         with self.lock:
@@ -682,7 +520,6 @@ class PlaybackManager(QObject):
                 return
 
             new_volume = self._volume_start + (self._target_volume - self._volume_start) * eased
-            self._update_playback_start()
             self.volume = new_volume
 
             self._volume_step += 1
@@ -692,91 +529,27 @@ class PlaybackManager(QObject):
             t = self._speed_step / self._speed_steps
             eased = 1 - (1 - t) ** 3
 
-            if self._speed_step > self._speed_steps:
-                self.speed = self._target_speed
-                self._speed_timer.stop()
+            finished = self._speed_step > self._speed_steps
 
-                if self._stop_on_end:
-                    self.stop()
-                
-                if self.cleanup_on_finished:
-                    self.cleanup()
+            if finished:
+                new_speed = self._target_speed
+                self._speed_timer.stop()
 
-                return
+            else:
+                new_speed = self._speed_start + (self._target_speed - self._speed_start) * eased
+                self._speed_step += 1
 
-            new_speed = self._speed_start + (self._target_speed - self._speed_start) * eased
-            self._update_playback_start()
             self.speed = new_speed
 
-            self._speed_step += 1
-    
-    def _bitcrush_tick(self):
-        i = self._bc_step
-        steps = self._bc_steps
-
-        if i >= steps:
-            self._bitcrush_bits = self._bc_target["bits"]
-            self._bitcrush_downsample = self._bc_target["down"]
-            self._bitcrush_mix = self._bc_target["mix"]
+        # The final step lands on the target speed, listeners get it before the stop or cleanup it may trigger.
+        self.speed_changed.emit(new_speed)
 
-            self._bc_timer.stop()
-            return
-
-        t = i / float(steps)
-        eased = t * t * (3.0 - 2.0 * t)
-
-        with self.lock:
-            b0 = self._bc_start["bits"]; b1 = self._bc_target["bits"]
-            d0 = self._bc_start["down"]; d1 = self._bc_target["down"]
-            m0 = self._bc_start["mix"]; m1 = self._bc_target["mix"]
-
-            self._bitcrush_bits = int(round(b0 + (b1 - b0) * eased))
-            self._bitcrush_downsample = max(1, int(round(d0 + (d1 - d0) * eased)))
-            self._bitcrush_mix = float(m0 + (m1 - m0) * eased)
-
-        self._bc_step += 1
-
-    def _midpass_tick(self):
-        i = self._mid_step
-        steps = self._mid_steps
-
-        if i >= steps:
-            with self.lock:
-                self.midpass_center = float(self._mid_target["center"])
-                self.midpass_q = float(self._mid_target["q"])
-                self.midpass_mix = float(self._mid_target["mix"])
-                self.midpass_gain = float(self._mid_target["gain"])
-                self._b, self._a = self._compute_biquad_bandpass(self.midpass_center, self.midpass_q)
-
-                if self._mid_target["mix"] == 0.0:
-                    self.midpass_enabled = False
+        if finished:
+            if self._stop_on_end:
+                self.stop()
             
-            self._mid_timer.stop()
-            return
-
-        denom = float(max(1, steps - 1))
-        t = float(i) / denom
-        eased = t * t * (3.0 - 2.0 * t)
-
-        with self.lock:
-            c0 = self._mid_start["center"]; c1 = self._mid_target["center"]
-            q0 = self._mid_start["q"]; q1 = self._mid_target["q"]
-            m0 = self._mid_start["mix"]; m1 = self._mid_target["mix"]
-            g0 = self._mid_start["gain"]; g1 = self._mid_target["gain"]
-
-            new_center = c0 + (c1 - c0) * eased
-            new_q = q0 + (q1 - q0) * eased
-            new_mix = m0 + (m1 - m0) * eased
-            new_gain = g0 + (g1 - g0) * eased
-
-            self.midpass_center = float(new_center)
-            self.midpass_q = float(max(0.001, new_q))
-            self.midpass_mix = float(max(0.0, min(1.0, new_mix)))
-            self.midpass_gain = float(new_gain)
-
-            self._b, self._a = self._compute_biquad_bandpass(self.midpass_center, self.midpass_q)
-
-        self._mid_step += 1
+            if self.cleanup_on_finished:
+                self.cleanup()
     
     def toggle_playback(self, ms = None):
         if self.is_playing:
@@ -786,20 +559,18 @@ class PlaybackManager(QObject):
             self.play(ms)
     
     def cleanup(self):
+        stats = self.stats.snapshot()
+
+        if stats["underflows"] or stats["overflows"] or stats["late_blocks"]:
+            logger.warning(
+                f"Audio stream had {stats['underflows']} underflows, {stats['overflows']} overflows and "
+                f"{stats['late_blocks']} late blocks over {stats['callbacks']} callbacks (blocksize {stats['blocksize']})"
+            )
+
         with self.lock:
-            try:
-                if self.stream:
-                    self.stream.abort()
-                    self.stream.close()
-                    self.stream = None
-            
-            except Exception:
-                logger.error(f"Error during stream cleanup: {traceback.format_exc()}")
-            
+            mixer.unregister(self)
             self.stream = None
             
-            self._bc_timer.stop()
-            self._mid_timer.stop()
             self._speed_timer.stop()
             self._volume_timer.stop()
 
@@ -807,8 +578,8 @@ class PlaybackManager(QObject):
 
             self.data = None
             self.fs = None
-            self._filter_states = None
-            self._bitcrush_state = None
+            self.dsp = None
             self.position = 0.0
+            self.clock.reset(0.0)
 
 player = PlaybackManager()
\ No newline at end of file
@@ -330,20 +330,12 @@ class Port:
 
         return target_track
     
-    def _make_glyph(base_glyph, track, segments=None, copy_effects=False):
-        new = base_glyph.copy()
-        new["track"] = track
-
-        if segments is None:
-            new.pop("segments", None)
-        
-        else:
-            new["segments"] = list(segments)
-
-        if copy_effects and "effects" in new:
-            new["effects"] = [e.copy() for e in new["effects"]]
-
-        return new
+    def _make_glyph(base_glyph, track, segments=None):
+        # base_glyph is a GlyphView, the ported glyph shares everything with it but the track and segments.
+        return base_glyph.replace(
+            track = track,
+            segments = None if segments is None else list(segments)
+        )
 
     def port_glyphs(port_to: str, composition):
         only_singles, only_effects = composition.sorted_glyphs()
@@ -362,21 +354,19 @@ class Port:
                 seg_dst = ModelSegments[port_to][target_track[0]]
                 ported_segments = port_segments_func(seg_src, seg_dst, effect["segments"])
 
-                eff_for_conversion = effect.copy()
-                eff_for_conversion["track"] = target_track[0]
-                eff_for_conversion["segments"] = ported_segments
+                eff_for_conversion = effect.replace(track = target_track[0], segments = ported_segments)
 
                 list_of_glyphs = GlyphEffects.effect_to_glyph(eff_for_conversion, composition.bpm, port_to)
                 ported_glyphs.extend(list_of_glyphs)
                 logger.warning(f"Extending 1: {list_of_glyphs}")
 
             for track in target_track:
-                eff_copy = Port._make_glyph(effect, track, segments=None, copy_effects=True)
-
                 if isinstance(track, tuple):
                     tr, segment = track
-                    eff_copy["track"] = tr
-                    eff_copy["segments"] = [segment]
+                    eff_copy = Port._make_glyph(effect, tr, segments=[segment])
+
+                else:
+                    eff_copy = Port._make_glyph(effect, track, segments=None)
 
                 logger.warning(f"Generating effect: {eff_copy['track']}, segments: {eff_copy.get('segments')}")
                 list_of_glyphs = GlyphEffects.effect_to_glyph(eff_copy, composition.bpm, port_to)
@@ -0,0 +1,202 @@
+import os
+import json
+import mmap
+import zlib
+import struct
+
+import numpy as np
+
+from System import GlyphTable
+
+# File: header, section table, then the section payloads back to back.
+MAGIC = b"CASSPRJ\0"
+VERSION = 2
+
+HEADER = struct.Struct("<8sHH")
+ENTRY = struct.Struct("<16s8sB7xQQQ")
+
+COMPRESSED = 1
+COMPRESS_MIN_BYTES = 1024
+
+# Payload offsets are padded to this, so uncompressed columns map straight into aligned arrays.
+ALIGNMENT = 8
+
+GLYPH_COLUMNS = [name for name in GlyphTable.COLUMNS if name != "alive"]
+
+class ProjectFile:
+    # Parses only the section table on open, payloads are read from the mapping when asked for.
+    def __init__(self, path):
+        self.path = path
+        self.file = open(path, "rb")
+        self.map = mmap.mmap(self.file.fileno(), 0, access = mmap.ACCESS_READ)
+        self.sections = {}
+
+        magic, version, count = HEADER.unpack_from(self.map, 0)
+
+        if magic != MAGIC:
+            self.close()
+            raise ValueError(f"{path} is not a Cassette project file")
+
+        if version > VERSION:
+            self.close()
+            raise ValueError(f"{path} was written by a newer version (format {version})")
+
+        for i in range(count):
+            name, dtype, flags, offset, length, raw_length = ENTRY.unpack_from(self.map, HEADER.size + i * ENTRY.size)
+            self.sections[name.rstrip(b"\0").decode()] = (dtype.rstrip(b"\0").decode(), flags, offset, length, raw_length)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def __contains__(self, name):
+        return name in self.sections
+
+    def close(self):
+        self.file.close()
+
+        try:
+            self.map.close()
+
+        except BufferError:
+            # Arrays handed out by array() still view the mapping, it is unmapped once they are gone.
+            pass
+
+    def raw(self, name):
+        _, flags, offset, length, _ = self.sections[name]
+        data = self.map[offset:offset + length]
+
+        return zlib.decompress(data) if flags & COMPRESSED else data
+
+    def json(self, name):
+        return json.loads(self.raw(name).decode("utf-8"))
+
+    def array(self, name):
+        # Read - only: uncompressed sections are views into the mapping, compressed ones into their decompressed bytes.
+        dtype, flags, offset, length, _ = self.sections[name]
+
+        if flags & COMPRESSED:
+            return np.frombuffer(self.raw(name), dtype = dtype)
+
+        return np.frombuffer(self.map, dtype = dtype, count = length // np.dtype(dtype).itemsize, offset = offset)
+
+def _encode(name, payload, dtype, compress):
+    raw_length = len(payload)
+    flags = 0
+
+    if compress and raw_length >= COMPRESS_MIN_BYTES:
+        packed = zlib.compress(payload, 6)
+
+        if len(packed) < raw_length:
+            payload = packed
+            flags |= COMPRESSED
+
+    return name, dtype, flags, payload, raw_length
+
+def write_project(path, settings, arrays, compress = True):
+    # settings is the save without glyphs, arrays comes from GlyphTable.to_arrays().
+    meta = dict(settings)
+    audio = dict(meta.get("audio", {}))
+    beats = np.asarray(audio.pop("beats", []), dtype = "<f4")
+    meta["audio"] = audio
+
+    index = {
+        "keys": arrays["keys"],
+        "tracks": arrays["tracks"],
+        "effects": arrays["effects"],
+        "extras": arrays["extras"],
+        "segment_order": arrays["segment_order"]
+    }
+
+    sections = [
+        _encode("meta", json.dumps(meta, ensure_ascii = False).encode("utf-8"), "", compress),
+        _encode("beats", beats.tobytes(), beats.dtype.str, compress),
+        _encode("glyph_index", json.dumps(index, ensure_ascii = False).encode("utf-8"), "", compress)
+    ]
+
+    for name in GLYPH_COLUMNS:
+        column = np.ascontiguousarray(arrays[name])
+        column = column.astype(column.dtype.newbyteorder("<"), copy = False)
+        sections.append(_encode(name, column.tobytes(), column.dtype.str, compress))
+
+    offset = HEADER.size + ENTRY.size * len(sections)
+    table = []
+    payloads = []
+
+    for name, dtype, flags, payload, raw_length in sections:
+        padding = -offset % ALIGNMENT
+        payloads.append(b"\0" * padding + payload)
+        offset += padding
+
+        table.append(ENTRY.pack(name.encode(), dtype.encode(), flags, offset, len(payload), raw_length))
+        offset += len(payload)
+
+    tmp_path = f"{path}.tmp"
+
+    with open(tmp_path, "wb") as f:
+        f.write(HEADER.pack(MAGIC, VERSION, len(sections)))
+        f.writelines(table)
+        f.writelines(payloads)
+        f.flush()
+        os.fsync(f.fileno())
+
+    os.replace(tmp_path, path)
+
+def find_snapshot(folder, binary):
+    # The snapshot a load reads: the format binary_saves asks for first, the other one if only that exists.
+    names = ("Save.cass", "Save.json") if binary else ("Save.json", "Save.cass")
+
+    for name in names:
+        path = os.path.join(folder, name)
+
+        if os.path.exists(path):
+            return path
+
+    return None
+
+def read_meta(path):
+    with ProjectFile(path) as project:
+        return project.json("meta")
+
+def read_arrays(project):
+    index = project.json("glyph_index")
+    arrays = {name: project.array(name) for name in GLYPH_COLUMNS}
+
+    # Glyph ids come back as strings, the same as after a Save.json round trip, so journal replays match them.
+    index["keys"] = [str(key) for key in index["keys"]]
+    arrays.update(index)
+    return arrays
+
+def read_project(path):
+    with ProjectFile(path) as project:
+        settings = project.json("meta")
+        settings.setdefault("audio", {})["beats"] = project.array("beats").tolist()
+        settings["glyphs"] = GlyphTable.GlyphTable.from_arrays(read_arrays(project)).to_dict()
+
+    return settings
+
+def json_to_binary(json_path, binary_path):
+    with open(json_path, "r", encoding = "utf-8") as f:
+        settings = json.load(f)
+
+    table = GlyphTable.GlyphTable()
+
+    for key, glyph in settings.pop("glyphs", {}).items():
+        table.set(key, glyph)
+
+    write_project(binary_path, settings, table.to_arrays())
+
+def write_json(json_path, settings):
+    tmp_path = f"{json_path}.tmp"
+
+    with open(tmp_path, "w", encoding = "utf-8") as f:
+        json.dump(settings, f, ensure_ascii = False, indent = 4)
+        f.flush()
+        os.fsync(f.fileno())
+
+    os.replace(tmp_path, json_path)
+
+def binary_to_json(binary_path, json_path):
+    write_json(json_path, read_project(binary_path))
@@ -1,5 +1,4 @@
 import os
-import json
 import shutil
 import random
 import webbrowser
@@ -11,6 +10,7 @@ from PyQt5.QtWidgets import *
 from System import UI
 from System import Utils
 from System import Styles
+from System import Library
 from System import ProjectSaver
 
 from System.Constants import *
@@ -18,51 +18,7 @@ from System.AudioSetupper import AudioSetupDialog
 
 from loguru import logger
 
-def get_projects_info(songs_folder):
-    projects = {}
-    
-    os.makedirs(songs_folder, exist_ok=True)
-
-    for project_name in os.listdir(songs_folder):
-        project_path = os.path.join(songs_folder, project_name)
-        if not os.path.isdir(project_path):
-            continue
-
-        audio_path = None
-        json_file = None
-
-        for file in os.listdir(project_path):
-            if file.lower().endswith(('.mp3', '.wav', '.ogg', '.flac')):
-                audio_path = os.path.join(project_path, file)
-            
-            elif file.lower().endswith('.json'):
-                json_file = os.path.join(project_path, file)
-
-        if audio_path and json_file:
-            with open(json_file, 'r', encoding='utf-8') as f:
-                try:
-                    save_data = json.load(f)
-                
-                except Exception as e:
-                    save_data = None
-
-            try:
-                projects[project_name] = {
-                    "audio_path": audio_path,
-                    "save": save_data,
-                    "title": save_data["audio"]["title"],
-                    "artist": save_data["audio"]["artist"],
-                    "model": code_to_number_model(save_data["model"]),
-                }
-            
-            except Exception:
-                pass
-        
-        else:
-            logger.warning(f"Project '{project_name}' is missing audio or JSON file. Removing.")
-            shutil.rmtree(project_path)
-    
-    return projects
+TRACK_GRID_COLUMNS = 2
 
 class TrackItemWidget(QWidget):
     edit_clicked = pyqtSignal(str)
@@ -282,6 +238,10 @@ class MainMenu(QWidget):
             }}
         """)
         
+        self.library = Library.Library(Utils.get_songs_path(""))
+        self.library.entry_refreshed.connect(self.on_library_entry)
+        self.track_items = {}
+        
         self.setup_ui()
         
         layout = QVBoxLayout(self)
@@ -490,21 +450,63 @@ class MainMenu(QWidget):
         layout.setSpacing(15)
         layout.setContentsMargins(0, 0, 0, 0)
         
-        tracks_data = get_projects_info(Utils.get_songs_path(""))
-        tracks_data = [
-            (project_id, data["title"], data["artist"], "- " + data["model"], f"{data['save']['progress']}% done.")
-            for project_id, data in tracks_data.items()
-        ]
+        self.tracks_grid = layout
+        self.track_items = {}
+        
+        # Cached summaries show right away, changed projects are re-read in the background and swapped in.
+        projects, stale = self.library.scan()
+        
+        for project_id, data in projects.items():
+            self.track_items[project_id] = self.create_track_item(project_id, data)
         
-        num_columns = 2
-        for i, data in enumerate(tracks_data):
-            row = i // num_columns
-            col = i % num_columns
-            track_item = TrackItemWidget(*data, main_menu = self)
-            track_item.edit_clicked.connect(self.on_edit_project)
-            layout.addWidget(track_item, row, col)
+        self.layout_track_items()
+        self.library.refresh(stale)
         
         return widget
+    
+    def create_track_item(self, project_id, data):
+        track_item = TrackItemWidget(
+            project_id,
+            data["title"],
+            data["artist"],
+            "- " + data["model"],
+            f"{data['progress']}% done.",
+            main_menu = self
+        )
+        track_item.edit_clicked.connect(self.on_edit_project)
+        
+        return track_item
+    
+    def layout_track_items(self):
+        for track_item in self.track_items.values():
+            self.tracks_grid.removeWidget(track_item)
+        
+        for i, track_item in enumerate(self.track_items.values()):
+            self.tracks_grid.addWidget(track_item, i // TRACK_GRID_COLUMNS, i % TRACK_GRID_COLUMNS)
+    
+    def on_library_entry(self, project_id, data):
+        old_item = self.track_items.get(project_id)
+        
+        if data is None:
+            if old_item is None:
+                return
+            
+            del self.track_items[project_id]
+            self.tracks_grid.removeWidget(old_item)
+            old_item.deleteLater()
+            self.layout_track_items()
+            return
+        
+        track_item = self.create_track_item(project_id, data)
+        self.track_items[project_id] = track_item
+        
+        if old_item is None:
+            i = len(self.track_items) - 1
+            self.tracks_grid.addWidget(track_item, i // TRACK_GRID_COLUMNS, i % TRACK_GRID_COLUMNS)
+        
+        else:
+            self.tracks_grid.replaceWidget(old_item, track_item)
+            old_item.deleteLater()
 
     def showEvent(self, event):
         self.refresh_tracks()
@@ -1,19 +1,35 @@
 import os
 import av
+import atexit
 import copy
 import json
+import contextlib
+import collections.abc
+import time
 import random
 import shutil
+import threading
+import traceback
 import subprocess
+import multiprocessing
+import concurrent.futures
+
+from PyQt5.QtCore import QTimer
 
 from System import UI
 from System import Porter
 from System import ExporterImporter
 from System import GlyphEffects
+from System import EffectWorker
 from System import RTVisualizer
+from System import GlyphTable
+from System import Timeline
+from System import ProjectFormat
+from System import History
 
 from System.Constants import *
 from System import Utils
+from loguru import logger
 
 import av
 
@@ -29,33 +45,309 @@ def get_metadata(file_path):
     
     return title, artist
 
-class SyncedDict(dict):
+def snapshot_path(id, binary = None):
+    json_path = Utils.get_songs_path(f"{id}/Save.json")
+    binary_path = Utils.get_songs_path(f"{id}/Save.cass")
+
+    if binary is None:
+        # Whichever snapshot exists, preferring the format binary_saves asks for.
+        binary = CurrentSettings["binary_saves"]
+        found = ProjectFormat.find_snapshot(os.path.dirname(json_path), binary)
+
+        if found:
+            return found
+
+    return binary_path if binary else json_path
+
+def migrate_save(id):
+    # Converts the snapshot to the format the binary_saves setting asks for. journal_generation is carried over, so the journal still applies.
+    binary = CurrentSettings["binary_saves"]
+    wanted_path = snapshot_path(id, binary)
+    other_path = snapshot_path(id, not binary)
+
+    if os.path.exists(wanted_path) or not os.path.exists(other_path):
+        return
+
+    try:
+        if binary:
+            ProjectFormat.json_to_binary(other_path, wanted_path)
+
+        else:
+            ProjectFormat.binary_to_json(other_path, wanted_path)
+
+    except Exception:
+        logger.error(f"Failed to migrate the save of {id}, keeping {other_path}: {traceback.format_exc()}")
+        return
+
+    os.remove(other_path)
+    logger.debug(f"Migrated the save of {id} to {wanted_path}")
+
+def load_save(id):
+    # Save.json (or Save.cass) is the last compacted snapshot, Save.journal holds the edits made since then.
+    migrate_save(id)
+    save_path = snapshot_path(id)
+    journal_path = Utils.get_songs_path(f"{id}/Save.journal")
+
+    if save_path.endswith(".cass"):
+        settings = ProjectFormat.read_project(save_path)
+
+    else:
+        with open(save_path, "r", encoding="utf-8") as f:
+            settings = json.load(f)
+
+    if not os.path.exists(journal_path):
+        return settings
+
+    glyphs = settings.setdefault("glyphs", {})
+    generation = settings.get("journal_generation", 0)
+    replayed = 0
+
+    with open(journal_path, "r", encoding="utf-8") as f:
+        lines = iter(f)
+
+        try:
+            header = json.loads(next(lines))
+
+        except (StopIteration, ValueError):
+            return settings
+
+        # A journal left over from before the last compaction is already part of the snapshot.
+        if header.get("generation") != generation:
+            return settings
+
+        for line in lines:
+            try:
+                record = json.loads(line)
+
+            except ValueError:
+                # Torn tail from a crash mid - append, everything before it is intact.
+                break
+
+            if record["op"] == "set":
+                glyphs[record["id"]] = record["glyph"]
+
+            else:
+                glyphs.pop(record["id"], None)
+
+            replayed += 1
+
+    logger.debug(f"Replayed {replayed} journal records for {id}")
+    return settings
+
+_effect_pool = None
+
+def effect_pool():
+    # Started by the first load that goes over EFFECT_POOL_MIN_GLYPHS, most sessions never need it.
+    global _effect_pool
+    
+    if _effect_pool is None:
+        # Spawned workers re-import the main script, which only starts the app under its __main__ guard.
+        _effect_pool = concurrent.futures.ProcessPoolExecutor(
+            max_workers = max(1, min(4, (os.cpu_count() or 2) - 1)),
+            mp_context = multiprocessing.get_context("spawn")
+        )
+        atexit.register(_effect_pool.shutdown, wait = False, cancel_futures = True)
+    
+    return _effect_pool
+
+class SyncedDict(collections.abc.MutableMapping):
+    # Dict view over a GlyphTable, reads hand out fresh glyph dicts and writes go through the table.
     def __init__(self, *args, sync_callback, composition, **kwargs):
-        super().__init__(*args, **kwargs)
+        self.table = GlyphTable.GlyphTable()
         self.composition = composition
         self._sync_callback = sync_callback
-        self._glyph_id_to_track = {}
         
+        for key, glyph in dict(*args, **kwargs).items():
+            self.table.set(key, glyph)
+        
+        self.history = None
         self.visualizator_data = {}
+        # glyph id -> keys of its expanded effect entries, so removal never scans the track.
+        self._children = {}
+        self._listeners = []
+        self._pending_changes = {}
+        
+        self._batch_depth = 0
+        self._batch_keys = {}
+        self._batch_effects = {}
+        
+        self._expansions = {}
+        self._expansion_timer = QTimer()
+        self._expansion_timer.setInterval(30)
+        self._expansion_timer.timeout.connect(self._collect_expansions)
+        
         self._process_initial_data()
+        self._pending_changes.clear()
+    
+    def __getitem__(self, key):
+        glyph = self.table.get(key)
+        
+        if glyph is None:
+            raise KeyError(key)
+        
+        return glyph
+    
+    def __contains__(self, key):
+        return key in self.table
+    
+    def __iter__(self):
+        return iter(self.table)
+    
+    def __len__(self):
+        return len(self.table)
+    
+    def to_dict(self):
+        return self.table.to_dict()
+    
+    def snapshot(self):
+        return self.table.snapshot()
+    
+    def keys_on_track(self, track):
+        return self.table.keys_on_track(track)
+    
+    def keys_in_range(self, start, end):
+        return self.table.keys_in_range(start, end)
+    
+    def query(self, track, start, end):
+        return self.table.query(track, start, end)
+    
+    def shift(self, keys, offset):
+        with self._edit(keys):
+            self.table.shift(keys, offset)
+            self._refresh(keys)
+    
+    def scale(self, keys, factor, origin = 0.0):
+        with self._edit(keys):
+            self.table.scale(keys, factor, origin)
+            self._refresh(keys)
+    
+    def _refresh(self, keys):
+        for key in keys:
+            self._remove_glyph_from_visualizator(key)
+            self._place(key, self[key])
+        
+        self._commit(keys)
+    
+    def subscribe(self, callback):
+        # callback(track, upserts, removals) receives per - track changes to visualizator_data after every mutation.
+        if callback not in self._listeners:
+            self._listeners.append(callback)
+    
+    def unsubscribe(self, callback):
+        if callback in self._listeners:
+            self._listeners.remove(callback)
+    
+    def _record_change(self, track, key, item = None):
+        upserts, removals = self._pending_changes.setdefault(track, ({}, set()))
+        
+        if item is None:
+            upserts.pop(key, None)
+            removals.add(key)
+        
+        else:
+            removals.discard(key)
+            upserts[key] = item
+    
+    def _emit_changes(self):
+        changes, self._pending_changes = self._pending_changes, {}
+        
+        for track, (upserts, removals) in changes.items():
+            for callback in self._listeners:
+                callback(track, upserts, removals)
     
     def _process_initial_data(self):
-        for glyph_id, glyph_data in self.items():
-            track = glyph_data.get("track")
+        effect_glyphs = [
+            (glyph_id, glyph_data) for glyph_id, glyph_data in self.items()
+            if "effect" in glyph_data and glyph_data["effect"]["name"] != "None"
+        ]
+        
+        if len(effect_glyphs) >= EFFECT_POOL_MIN_GLYPHS and self._start_expansion(effect_glyphs):
+            for glyph_id, glyph_data in self.items():
+                if "effect" not in glyph_data or glyph_data["effect"]["name"] == "None":
+                    self._add_glyph_to_visualizator(glyph_id, glyph_data)
             
-            if track:
-                self._glyph_id_to_track[glyph_id] = track
+            return
         
         for glyph_id, glyph_data in self.items():
             self._process_glyph_effect(glyph_id, glyph_data)
             self._add_glyph_to_visualizator(glyph_id, glyph_data)
     
+    # Background expansion - - - - - - - - - - - - - - - - - - - -
+    
+    def _start_expansion(self, effect_glyphs):
+        try:
+            pool = effect_pool()
+            
+            for i in range(0, len(effect_glyphs), EFFECT_POOL_CHUNK):
+                chunk = effect_glyphs[i:i + EFFECT_POOL_CHUNK]
+                future = pool.submit(EffectWorker.expand_chunk, chunk, self.composition.bpm, self.composition.model)
+                self._expansions[future] = chunk
+        
+        except Exception:
+            logger.error(f"Effect pool unavailable, expanding on the GUI thread: {traceback.format_exc()}")
+            self.stop_expansion()
+            return False
+        
+        self._expansion_started = time.perf_counter()
+        self._expansion_count = len(effect_glyphs)
+        self._expansion_timer.start()
+        
+        return True
+    
+    def _collect_expansions(self):
+        finished = [future for future in self._expansions if future.done()]
+        
+        expanded = []
+        
+        for future in finished:
+            chunk = self._expansions.pop(future)
+            
+            try:
+                results = future.result()
+            
+            except Exception:
+                logger.error(f"Effect expansion chunk failed, retrying locally: {traceback.format_exc()}")
+                results = EffectWorker.expand_chunk(chunk, self.composition.bpm, self.composition.model)
+            
+            for (glyph_id, submitted), (_, effect_glyph_data) in zip(chunk, results):
+                # Glyphs edited meanwhile were already expanded synchronously by the edit.
+                current = self.table.get(glyph_id)
+                
+                if current != submitted:
+                    continue
+                
+                GlyphEffects.remember(current, self.composition.bpm, self.composition.model, glyph_id, effect_glyph_data)
+                self.composition.cached_effects[str(glyph_id)] = effect_glyph_data
+                
+                self._remove_glyph_from_visualizator(glyph_id)
+                self._add_glyph_to_visualizator(glyph_id, current)
+                expanded.append(glyph_id)
+        
+        self._emit_changes()
+        
+        if expanded:
+            # The glyphs themselves did not change, only their expansion did.
+            self._sync_callback(self, expanded, resend = True)
+        
+        if not self._expansions:
+            self._expansion_timer.stop()
+            logger.debug(f"Expanded {self._expansion_count} effect glyphs in {(time.perf_counter() - self._expansion_started) * 1000:.1f} ms")
+    
+    def stop_expansion(self):
+        self._expansion_timer.stop()
+        
+        for future in self._expansions:
+            future.cancel()
+        
+        self._expansions.clear()
+    
     def _process_glyph_effect(self, glyph_id, glyph_data):
         if "effect" in glyph_data and glyph_data["effect"]["name"] != "None":
             effect_glyph_data = GlyphEffects.effect_to_glyph(
                 glyph_data, 
                 self.composition.bpm, 
-                self.composition.model
+                self.composition.model,
+                seed = glyph_id
             )
             
             self.composition.cached_effects[str(glyph_id)] = effect_glyph_data
@@ -67,98 +359,252 @@ class SyncedDict(dict):
         track = glyph_data["track"]
         
         if track not in self.visualizator_data:
-            self.visualizator_data[track] = {}
+            self.visualizator_data[track] = Timeline.TrackItems()
         
         if "effect" not in glyph_data or glyph_data["effect"]["name"] == "None":
             self.visualizator_data[track][glyph_id] = glyph_data
+            self._record_change(track, glyph_id, glyph_data)
         
         else:
             if str(glyph_id) in self.composition.cached_effects:
                 effect_glyphs = self.composition.cached_effects[str(glyph_id)]
+                children = self._children[glyph_id] = []
                 
-                #if isinstance(effect_glyphs, list):
                 for idx, effect_glyph in enumerate(effect_glyphs):
                     effect_glyph_id = f"effect_{glyph_id}_{idx}"
                     self.visualizator_data[track][effect_glyph_id] = effect_glyph
-                #
-                #else:
-                #    effect_glyph_id = f"effect_{glyph_id}"
-                #    self.visualizator_data[track][effect_glyph_id] = effect_glyphs
+                    self._record_change(track, effect_glyph_id, effect_glyph)
+                    children.append(effect_glyph_id)
     
     def _remove_glyph_from_visualizator(self, glyph_id):
-        track = self._glyph_id_to_track.get(glyph_id)
+        track = self.table.track(glyph_id)
+        children = self._children.pop(glyph_id, ())
         
-        if track and track in self.visualizator_data:
-            self.visualizator_data[track].pop(glyph_id, None)
-
-            keys_to_remove = [
-                k for k in self.visualizator_data[track].keys() 
-                if str(k).startswith(f"effect_{glyph_id}")
-            ]
+        if track is not None and track in self.visualizator_data:
+            items = self.visualizator_data[track]
             
-            for k in keys_to_remove:
-                self.visualizator_data[track].pop(k)
-
-            if not self.visualizator_data[track]:
+            if items.pop(glyph_id, None) is not None:
+                self._record_change(track, glyph_id)
+            
+            for k in children:
+                if items.pop(k, None) is not None:
+                    self._record_change(track, k)
+            
+            if not items:
                 self.visualizator_data.pop(track, None)
     
-    def __setitem__(self, key, value):
-        if key in self:
-            self._remove_glyph_from_visualizator(key)
+    @contextlib.contextmanager
+    def _edit(self, keys):
+        # Every mutation is an undo step of its own unless it runs inside a wider History.step().
+        if self.history is None:
+            yield
+            return
         
-        self._process_glyph_effect(key, value)
+        with self.history.step():
+            self.history.touch(keys)
+            yield
+    
+    def _place(self, key, glyph):
+        # Effect glyphs edited inside a batch are expanded together when it ends.
+        if self._batch_depth and "effect" in glyph and glyph["effect"]["name"] != "None":
+            self._batch_effects[key] = None
+            return
         
-        super().__setitem__(key, value)
+        self._process_glyph_effect(key, glyph)
+        self._add_glyph_to_visualizator(key, glyph)
+    
+    def _commit(self, keys):
+        if self._batch_depth:
+            self._batch_keys.update(dict.fromkeys(keys))
+            return
         
-        self._add_glyph_to_visualizator(key, value)
+        self._emit_changes()
+        self._sync_callback(self, keys)
+        self.composition.save(keys)
+    
+    @contextlib.contextmanager
+    def batch(self):
+        # Mutations inside run one effect pass, one visualizer update, one sync delta and one save on exit.
+        self._batch_depth += 1
         
-        track = value.get("track")
-        if track:
-            self._glyph_id_to_track[key] = track
+        try:
+            yield self
         
-        self._sync_callback(self)
-        self.composition.save()
+        finally:
+            self._batch_depth -= 1
+            
+            if self._batch_depth == 0:
+                self._finish_batch()
     
-    def __delitem__(self, key):
-        self.composition.cached_effects.pop(str(key), None)
-        self._remove_glyph_from_visualizator(key)
+    def _finish_batch(self):
+        keys, self._batch_keys = list(self._batch_keys), {}
+        effects, self._batch_effects = list(self._batch_effects), {}
         
-        super().__delitem__(key)
-        self._glyph_id_to_track.pop(key, None)
+        for key in effects:
+            glyph = self.table.get(key)
+            
+            # Deleted or stripped of its effect later in the batch, already handled by that edit.
+            if glyph is None or "effect" not in glyph or glyph["effect"]["name"] == "None":
+                continue
+            
+            self._remove_glyph_from_visualizator(key)
+            self._process_glyph_effect(key, glyph)
+            self._add_glyph_to_visualizator(key, glyph)
         
-        self._sync_callback(self)
-        self.composition.save()
+        if keys:
+            self._commit(keys)
     
-    def delete_keys(self, keys):
-        for key in keys:
+    def __setitem__(self, key, value):
+        with self._edit([key]):
+            if key in self:
+                self._remove_glyph_from_visualizator(key)
+            
+            self.table.set(key, value)
+            self._place(key, value)
+            
+            self._commit([key])
+    
+    def __delitem__(self, key):
+        with self._edit([key]):
             self.composition.cached_effects.pop(str(key), None)
             self._remove_glyph_from_visualizator(key)
+            
+            self.table.delete(key)
+            
+            self._commit([key])
+    
+    def delete_keys(self, keys):
+        with self._edit(keys):
+            for key in keys:
+                self.composition.cached_effects.pop(str(key), None)
+                self._remove_glyph_from_visualizator(key)
                 
-            super().__delitem__(key)
-            self._glyph_id_to_track.pop(key, None)
-        
-        self._sync_callback(self)
-        self.composition.save()
+                self.table.delete(key)
+            
+            self._commit(keys)
     
     def update(self, *args, **kwargs):
         glyphs_to_update = args[0]
         glyphs_to_update.update(kwargs)
         
-        for glyph_id, glyph_data in glyphs_to_update.items():
-            if glyph_id in self:
-                self._remove_glyph_from_visualizator(glyph_id)
+        with self._edit(list(glyphs_to_update)):
+            for glyph_id, glyph_data in glyphs_to_update.items():
+                if glyph_id in self:
+                    self._remove_glyph_from_visualizator(glyph_id)
+                
+                self.table.set(glyph_id, glyph_data)
+                self._place(glyph_id, glyph_data)
             
-            self._process_glyph_effect(glyph_id, glyph_data)
-            super().__setitem__(glyph_id, glyph_data)
-            self._add_glyph_to_visualizator(glyph_id, glyph_data)
+            self._commit(list(glyphs_to_update))
+    
+    def restore(self, states):
+        # Puts glyphs back to recorded values, None removes the glyph. Used by undo / redo.
+        for key, glyph in states.items():
+            self.composition.cached_effects.pop(str(key), None)
             
-            track = glyph_data.get("track")
+            if key in self:
+                self._remove_glyph_from_visualizator(key)
             
-            if track:
-                self._glyph_id_to_track[glyph_id] = track
+            if glyph is None:
+                if key in self.table:
+                    self.table.delete(key)
+                
+                continue
+            
+            self.table.set(key, glyph)
+            self._place(key, self.table.get(key))
         
-        self._sync_callback(self)
-        self.composition.save()
+        self._commit(list(states))
+
+class Autosaver:
+    # Edits only mark the project dirty, a background thread coalesces them and writes once the window passes.
+    def __init__(self, write, delay_ms = 1000):
+        self.write = write
+        self.delay = delay_ms / 1000.0
+
+        self.condition = threading.Condition()
+        self.write_lock = threading.Lock()
+        self.dirty = False
+        self.dirty_since = 0.0
+        self.closed = False
+
+        self.requests = 0
+        self.writes = 0
+        self.failures = 0
+        self.last_write_ms = 0.0
+
+        self.thread = threading.Thread(target = self._run, name = "Autosaver", daemon = True)
+        self.thread.start()
+
+    def mark_dirty(self):
+        with self.condition:
+            self.requests += 1
+
+            if not self.dirty:
+                self.dirty = True
+                self.dirty_since = time.monotonic()
+
+            self.condition.notify()
+
+    def _run(self):
+        while True:
+            with self.condition:
+                while not self.dirty and not self.closed:
+                    self.condition.wait()
+
+                if not self.dirty:
+                    return
+
+                deadline = self.dirty_since + self.delay
+                remaining = deadline - time.monotonic()
+
+                while remaining > 0 and not self.closed:
+                    self.condition.wait(remaining)
+                    remaining = deadline - time.monotonic()
+
+                self.dirty = False
+
+            self._write()
+
+    def _write(self):
+        with self.write_lock:
+            start = time.perf_counter()
+
+            try:
+                self.write()
+                self.writes += 1
+
+            except Exception:
+                self.failures += 1
+                logger.error(f"Autosave failed: {traceback.format_exc()}")
+
+            self.last_write_ms = (time.perf_counter() - start) * 1000.0
+
+    def flush(self):
+        with self.condition:
+            dirty, self.dirty = self.dirty, False
+
+        if dirty:
+            self._write()
+
+    def close(self):
+        self.flush()
+
+        with self.condition:
+            self.closed = True
+            self.condition.notify()
+
+        self.thread.join(timeout = 5.0)
+
+    def get_metrics(self):
+        return {
+            "requests": self.requests,
+            "writes": self.writes,
+            "writes_avoided": max(0, self.requests - self.writes - self.failures),
+            "failures": self.failures,
+            "last_write_ms": self.last_write_ms,
+            "pending": self.dirty
+        }
 
 class BaseComposition:
     def __init__(self, id: int, settings: dict):
@@ -275,15 +721,22 @@ class BaseComposition:
         container.close()
         output_container.close()
 
+    def glyph_snapshot(self):
+        # Read - only GlyphViews, porting overrides fields on the views instead of copying glyphs.
+        if isinstance(self.glyphs, SyncedDict):
+            return self.glyphs.snapshot()
+        
+        return {gid: GlyphTable.GlyphView(glyph) for gid, glyph in self.glyphs.items()}
+    
     def sorted_glyphs(self) -> tuple:
         singles, effects = [], []
 
-        for glyph in self.glyphs.values():
+        for glyph in self.glyph_snapshot().values():
             if "effect" in glyph:
-                effects.append(copy.deepcopy(glyph))
+                effects.append(glyph)
             
             else:
-                singles.append(copy.deepcopy(glyph))
+                singles.append(glyph)
 
         return singles, effects
 
@@ -315,10 +768,14 @@ class BaseComposition:
             )
         
         else:
-            singles, effects = self.sorted_glyphs()
-    
-            for effect in effects:
-                singles.extend(GlyphEffects.effect_to_glyph(effect, self.bpm, self.model))
+            singles = []
+
+            for gid, glyph in self.glyph_snapshot().items():
+                if "effect" in glyph:
+                    singles.extend(GlyphEffects.effect_to_glyph(glyph, self.bpm, self.model, seed = gid))
+                
+                else:
+                    singles.append(glyph)
             
             ExporterImporter.glyphs_to_ogg(
                 self.cropped_song_path,
@@ -328,9 +785,20 @@ class BaseComposition:
             )
         
         if open_folder:
+            self.export_json()
             Utils.open_file(os.path.abspath(Utils.get_songs_path(str(self.id))))
             Utils.ui_sound("Export")
     
+    def export_json(self):
+        # Binary projects get a plain JSON copy of the save next to the exported audio.
+        if not snapshot_path(self.id).endswith(".cass"):
+            return
+        
+        settings = {key: value for key, value in load_save(self.id).items() if key != "journal_generation"}
+        settings["glyphs"] = {str(gid): glyph.to_dict() for gid, glyph in self.glyph_snapshot().items()}
+        
+        ProjectFormat.write_json(Utils.get_songs_path(f"{self.id}/Composed.json"), settings)
+    
     def export_all(self):
         Utils.ui_sound("ExportLong")
 
@@ -338,15 +806,30 @@ class BaseComposition:
         for model in PortVariants[self.model]:
             self.export(number_model_to_code(model))
         
+        self.export_json()
         Utils.open_file(os.path.abspath(Utils.get_songs_path(str(self.id))))
 
 class Composition(BaseComposition):
     def __init__(self, audiofile_path: str | None = None, settings: dict = {}, id: int | None = None):
+        load_started = time.perf_counter()
+        
         if id:
-            settings = json.load(open(Utils.get_songs_path(f"{id}/Save.json"), "r", encoding="utf-8"))
+            settings = load_save(id)
         
         super().__init__(id, settings)
 
+        self.autosaver = None
+        # Keys only the save file knows about, the fields the composition owns are filled in at write time.
+        self.loaded_header = {key: value for key, value in settings.items() if key not in ("glyphs", "journal_generation")} if id else None
+        self.save_path = snapshot_path(self.id)
+        self.journal_path = Utils.get_songs_path(f"{self.id}/Save.journal")
+
+        self.journal_lock = threading.Lock()
+        self.journal_pending = set()
+        self.journal_generation = settings.get("journal_generation", 0)
+        self.journal_bytes = os.path.getsize(self.journal_path) if id and os.path.exists(self.journal_path) else 0
+        self.snapshot_bytes = os.path.getsize(self.save_path) if id else 0
+
         self.version = open("version").read()
         self.save_version = settings.get("version", self.version)
 
@@ -360,16 +843,12 @@ class Composition(BaseComposition):
         self.syncer = RTVisualizer.GlyphSyncer(self)
 
         self.cached_effects = {}
-        self.glyphs = SyncedDict(settings.get("glyphs", {}), sync_callback=self.syncer.sync, composition=self)
+        self.glyphs = SyncedDict(settings.get("glyphs", {}), sync_callback=self.syncer.sync_delta, composition=self)
         self.last_glyph_id = max(map(int, self.glyphs.keys())) if self.glyphs else 0
 
         if CurrentSettings["auto_search"]:
             self.syncer.start_scanning_loop()
 
-        for gid, glyph in self.glyphs.items():
-            if "effect" in glyph:
-                self.cached_effects[gid] = GlyphEffects.effect_to_glyph(glyph, self.bpm, self.model)
-
         self.syncer.full_load(self.glyphs)
         os.makedirs(Utils.get_songs_path(str(self.id)), exist_ok=True)
 
@@ -379,6 +858,16 @@ class Composition(BaseComposition):
         if not os.path.exists(self.cropped_song_path):
             self.prepare_cropped_audio(self.full_song_path)
 
+        self.autosaver = Autosaver(self.write_save, CurrentSettings["autosave_delay"])
+        
+        self.history = History.History(self.glyphs, CurrentSettings["history_budget"] * 1024 * 1024)
+        self.glyphs.history = self.history
+        
+        logger.debug(
+            f"Composition {self.id} loaded in {(time.perf_counter() - load_started) * 1000:.1f} ms, "
+            f"{len(self.glyphs)} glyphs, {len(self.glyphs._expansions)} effect chunks expanding in the background"
+        )
+
     def new_glyph(self, track, start, duration=None, brightness=None):
         self.last_glyph_id += 1
         glyph = {
@@ -396,6 +885,10 @@ class Composition(BaseComposition):
 
     def get_glyph(self, glyph_id: int):
         return self.glyphs.get(glyph_id)
+    
+    def query(self, track, start_ms, end_ms):
+        # Ids of the glyphs on track overlapping [start_ms, end_ms), in start order.
+        return self.glyphs.query(track, start_ms, end_ms)
 
     def copy_glyph(self, glyph: dict, offset: int = 0, audio_ms: int | None = None):
         new_glyph = copy.deepcopy(glyph)
@@ -426,45 +919,144 @@ class Composition(BaseComposition):
 
         return new_id, new_glyph
 
-    def save(self):
-        save_path = Utils.get_songs_path(f"{self.id}/Save.json")
+    def save(self, keys = ()):
+        with self.journal_lock:
+            self.journal_pending.update(keys)
+        
+        if self.autosaver is None:
+            self.write_save()
+        
+        else:
+            self.autosaver.mark_dirty()
+    
+    def flush_save(self):
+        if self.autosaver is not None:
+            self.autosaver.close()
+            logger.debug(f"Autosave closed: {self.autosaver.get_metrics()}")
+            self.autosaver = None
+        
+        if self.journal_bytes:
+            self.write_save(compact = True)
+    
+    def _build_save_header(self):
+        title, author = get_metadata(self.full_song_path)
+        title = title or os.path.basename(self.song_path)
+        author = author or "Unknown Artist"
+
+        return {
+            "audio": {
+                "title": title,
+                "artist": author,
+                "start_ms": self.start_ms,
+                "end_ms": self.end_ms,
+                "bpm": self.bpm,
+                "beats": self.beats,
+                "fade_in": self.fade_in_duration,
+                "fade_out": self.fade_out_duration
+            },
+            "progress": 0,
+            "model": self.model,
+            "version": self.version
+        }
+    
+    def _save_header(self):
+        if self.loaded_header is None:
+            self.loaded_header = self._build_save_header()
+
+        header = dict(self.loaded_header)
+        header["audio"] = dict(
+            header.get("audio", {}),
+            start_ms = self.start_ms,
+            end_ms = self.end_ms,
+            bpm = self.bpm,
+            beats = self.beats,
+            fade_in = self.fade_in_duration,
+            fade_out = self.fade_out_duration
+        )
+        header["model"] = self.model
+
+        return header
+    
+    def write_save(self, compact = False):
+        with self.journal_lock:
+            keys, self.journal_pending = self.journal_pending, set()
+        
+        if compact or not os.path.exists(self.save_path) or self.journal_bytes > self.snapshot_bytes * JOURNAL_COMPACT_RATIO:
+            self._write_snapshot()
+        
+        elif keys:
+            self._append_journal(keys)
+    
+    def _append_journal(self, keys):
+        table = self.glyphs.table
+        
+        with table.lock:
+            records = [
+                {"op": "set", "id": str(key), "glyph": table.get(key)} if key in table else {"op": "del", "id": str(key)}
+                for key in keys
+            ]
+        
+        lines = []
+        
+        if not self.journal_bytes:
+            lines.append(json.dumps({"generation": self.journal_generation}))
+        
+        lines.extend(json.dumps(record, ensure_ascii=False, separators=(",", ":")) for record in records)
+        payload = ("\n".join(lines) + "\n").encode("utf-8")
+        
+        with open(self.journal_path, "ab") as f:
+            f.write(payload)
+            f.flush()
+            os.fsync(f.fileno())
+        
+        self.journal_bytes += len(payload)
+    
+    def _write_snapshot(self):
         os.makedirs(Utils.get_songs_path(str(self.id)), exist_ok=True)
 
-        if os.path.exists(save_path):
-            with open(save_path, "r", encoding="utf-8") as f:
-                data = json.load(f)
+        header = self._save_header()
 
-            data["glyphs"] = self.glyphs
+        # Snapshot the columns under the table lock, encoding happens outside of it.
+        arrays = self.glyphs.table.to_arrays()
 
-            with open(save_path, "w", encoding="utf-8") as f:
-                json.dump(data, f, ensure_ascii=False, indent=4)
+        # Bumping the generation retires the old journal even if removing it below never happens.
+        generation = self.journal_generation + 1
+        save_path = snapshot_path(self.id, CurrentSettings["binary_saves"])
+
+        if save_path.endswith(".cass"):
+            ProjectFormat.write_project(save_path, dict(header, journal_generation = generation), arrays)
         
         else:
-            title, author = get_metadata(self.full_song_path)
-            title = title or os.path.basename(self.song_path)
-            author = author or "Unknown Artist"
-
-            dict_data = {
-                "audio": {
-                    "title": title,
-                    "artist": author,
-                    "start_ms": self.start_ms,
-                    "end_ms": self.end_ms,
-                    "bpm": self.bpm,
-                    "beats": self.beats,
-                    "fade_in": self.fade_in_duration,
-                    "fade_out": self.fade_out_duration
-                },
-                "progress": 0,
-                "model": self.model,
-                "version": self.version,
-                "glyphs": self.glyphs
-            }
-
-            dict_data["audio"].update({"title": title, "artist": author})
-
-            with open(save_path, "w", encoding="utf-8") as f:
-                json.dump(dict_data, f, ensure_ascii=False, indent=4)
+            glyphs = GlyphTable.GlyphTable.from_arrays(arrays).to_dict()
+            data = dict(header, journal_generation = generation, glyphs = glyphs)
+
+            tmp_path = f"{save_path}.tmp"
+
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(data, f, ensure_ascii=False, indent=4)
+                f.flush()
+                os.fsync(f.fileno())
+
+            os.replace(tmp_path, save_path)
+
+        # Switching the format setting migrates the project on its next snapshot.
+        if save_path != self.save_path and os.path.exists(self.save_path):
+            os.remove(self.save_path)
+
+        self.save_path = save_path
+
+        if os.path.exists(self.journal_path):
+            os.remove(self.journal_path)
+
+        self.journal_generation = generation
+        self.journal_bytes = 0
+        self.snapshot_bytes = os.path.getsize(self.save_path)
+    
+    def shift_glyphs(self, keys, offset):
+        self.glyphs.shift(keys, offset)
+    
+    def scale_glyphs(self, keys, factor, origin = 0.0):
+        self.glyphs.scale(keys, factor, origin)
     
     def update_bunch_of_glyphs(self, data: dict):
         self.glyphs.update(data)
@@ -481,6 +1073,18 @@ class Composition(BaseComposition):
     def delete_glyphs(self, keys):
         self.glyphs.delete_keys(keys)
     
+    @contextlib.contextmanager
+    def batch(self, label = "Edit"):
+        # One undo step and one coalesced update for everything changed inside.
+        with self.history.step(label), self.glyphs.batch():
+            yield self
+    
+    def undo(self):
+        return self.history.undo()
+    
+    def redo(self):
+        return self.history.redo()
+    
     def set_brightness(self, brightness):
         self.brightness = brightness
     
@@ -495,7 +1099,7 @@ class Composition(BaseComposition):
 
 class MinimalComposition(BaseComposition):
     def __init__(self, id: int):
-        settings = json.load(open(Utils.get_songs_path(f"{id}/Save.json"), "r", encoding="utf-8"))
+        settings = load_save(id)
 
         self.cropped_song_path = Utils.get_songs_path(f"{id}/cropped_song.ogg")
         self.full_song_path = Utils.get_songs_path(f"{id}/full_song.ogg")
@@ -317,6 +317,28 @@ class GlyphSyncer(QObject):
 				error = UI.ErrorWindow("Failed to communicate with Phone", str(e))
 				error.exec_()
 
+	def _glyph_changed(self, old, new):
+		if old is None:
+			return True
+		
+		return any(old.get(k) != new.get(k) for k in ("track", "start", "duration", "brightness", "effect", "segments"))
+
+	def _enrich(self, changed):
+		enriched = {}
+		
+		for gid, glyph in changed.items():
+			glyph_copy = dict(glyph)
+			
+			if "effect" in glyph:
+				effect_to_glyphs = getattr(self.composition, "cached_effects", {}).get(gid)
+				
+				if effect_to_glyphs is not None:
+					glyph_copy["effect_to_glyphs"] = effect_to_glyphs
+			
+			enriched[gid] = glyph_copy
+		
+		return enriched
+
 	def sync(self, current: dict):
 		if current is None:
 			current = {}
@@ -324,54 +346,48 @@ class GlyphSyncer(QObject):
 		current = {str(k): v for k, v in current.items()}
 		deleted = set(self.last_synced) - set(current)
 
-		def glyph_changed(g1, g2):
-			if g1 is None:
-				return True
-			
-			return any(g1.get(k) != g2.get(k) for k in ("track", "start", "duration", "brightness", "effect", "segments"))
-
 		changed = {
 			gid: glyph
 			for gid, glyph in current.items()
-			if glyph_changed(self.last_synced.get(gid), glyph)
+			if self._glyph_changed(self.last_synced.get(gid), glyph)
 		}
 
 		if deleted:
 			self._send_json({"action": "delete", "ids": list(deleted)})
 
 		if changed:
-			enriched = {}
-			
-			for gid, glyph in changed.items():
-				glyph_copy = glyph.copy()
-				
-				if "effect" in glyph:
-					effect_to_glyphs = getattr(self.composition, "cached_effects", {}).get(gid)
-					
-					if effect_to_glyphs is not None:
-						glyph_copy["effect_to_glyphs"] = effect_to_glyphs
-				
-				enriched[gid] = glyph_copy
-			
-			self._send_json({"action": "update", "glyphs": enriched})
+			self._send_json({"action": "update", "glyphs": self._enrich(changed)})
 
 		self.last_synced = {k: copy.deepcopy(v) for k, v in current.items()}
 
+	def sync_delta(self, current, keys, resend = False):
+		# Same messages as sync(), but only the glyphs an edit touched are diffed and copied. Resend skips the diff, for glyphs whose effect expansion changed.
+		deleted = []
+		changed = {}
+
+		for key in keys:
+			gid = str(key)
+			glyph = current.get(key) if current is not None else None
+
+			if glyph is None:
+				if self.last_synced.pop(gid, None) is not None:
+					deleted.append(gid)
+
+			elif resend or self._glyph_changed(self.last_synced.get(gid), glyph):
+				changed[gid] = glyph
+				self.last_synced[gid] = copy.deepcopy(glyph)
+
+		if deleted:
+			self._send_json({"action": "delete", "ids": deleted})
+
+		if changed:
+			self._send_json({"action": "update", "glyphs": self._enrich(changed)})
+
 	def full_load(self, glyphs: dict):
 		if glyphs is None:
 			glyphs = {}
 		
-		enriched = {}
-
-		for gid, glyph in glyphs.items():
-			glyph_copy = glyph.copy()
-			
-			if "effect" in glyph:
-				effect_to_glyphs = getattr(self.composition, "cached_effects", {}).get(gid)
-				if effect_to_glyphs is not None:
-					glyph_copy["effect_to_glyphs"] = effect_to_glyphs
-			
-			enriched[gid] = glyph_copy
+		enriched = self._enrich(glyphs)
 
 		payload = {
 			"action": "load",
@@ -379,7 +395,7 @@ class GlyphSyncer(QObject):
 		}
 
 		self._send_json(payload)
-		self.last_synced = copy.deepcopy(dict(glyphs))
+		self.last_synced = {str(k): copy.deepcopy(v) for k, v in glyphs.items()}
 
 	def play(self, ms: int):
 		self._send_json({"action": "play", "from_ms": ms})
@@ -0,0 +1,194 @@
+import os
+import glob
+import time
+import threading
+import traceback
+import collections
+
+import numpy as np
+import soundfile as sf
+
+from loguru import logger
+from System.Mixer import mixer
+
+SOUNDS_DIR = "System/Sounds"
+
+class Voice:
+    __slots__ = ("data", "position", "gain", "triggered_at", "started")
+
+    def __init__(self, data, gain, triggered_at):
+        self.data = data
+        self.position = 0
+        self.gain = gain
+        self.triggered_at = triggered_at
+        self.started = False
+
+class SoundBank:
+    def __init__(self, max_voices = 12, tone_step = 0.01, max_variants = 96):
+        self.channels = mixer.channels
+        self.max_voices = max_voices
+        self.tone_step = tone_step
+        self.max_variants = max_variants
+
+        self.sounds = {}
+        self.variants = collections.OrderedDict()
+        self.load_lock = threading.Lock()
+
+        self._loader = None
+        self._pending = collections.deque()
+        self._voices = []
+
+        self._trigger_times = collections.deque(maxlen = 64)
+        self._latencies = collections.deque(maxlen = 64)
+        self._callback_times = collections.deque(maxlen = 256)
+        self._stolen = 0
+
+    @property
+    def samplerate(self):
+        return mixer.samplerate
+
+    # Loading - - - - - - - - - - - - - - - - - - - - - - - - -
+
+    def preload(self):
+        if self._loader is not None:
+            return
+
+        self._loader = threading.Thread(target = self._load_all, name = "SoundBankLoader", daemon = True)
+        self._loader.start()
+
+    def _load_all(self):
+        # The device is opened here, ahead of the first click, instead of on the GUI thread in play().
+        mixer.start()
+
+        start = time.perf_counter()
+
+        for path in glob.glob(os.path.join(SOUNDS_DIR, "**", "*.wav"), recursive = True):
+            name = os.path.splitext(os.path.relpath(path, SOUNDS_DIR))[0].replace(os.sep, "/")
+
+            try:
+                self._get(name)
+
+            except Exception:
+                logger.error(f"Failed to decode UI sound {name}: {traceback.format_exc()}")
+
+        logger.debug(f"Sound bank decoded {len(self.sounds)} sounds in {(time.perf_counter() - start) * 1000:.1f} ms")
+
+    def _decode(self, name):
+        data, fs = sf.read(os.path.join(SOUNDS_DIR, f"{name}.wav"), dtype = "float32", always_2d = True)
+
+        if data.shape[1] < self.channels:
+            data = np.repeat(data[:, :1], self.channels, axis = 1)
+
+        data = data[:, :self.channels]
+
+        if fs != self.samplerate:
+            data = self._resample(data, self.samplerate / float(fs))
+
+        return np.ascontiguousarray(data, dtype = np.float32)
+
+    def _get(self, name):
+        sound = self.sounds.get(name)
+
+        if sound is not None:
+            return sound
+
+        with self.load_lock:
+            if name not in self.sounds:
+                self.sounds[name] = self._decode(name)
+
+            return self.sounds[name]
+
+    def _resample(self, data, factor):
+        length = max(1, int(len(data) * factor))
+        source = np.arange(len(data))
+        target = np.linspace(0, len(data) - 1, length)
+
+        return np.stack([np.interp(target, source, data[:, ch]) for ch in range(data.shape[1])], axis = -1).astype(np.float32)
+
+    def _variant(self, name, rate):
+        base = self._get(name)
+        rate = round(round(rate / self.tone_step) * self.tone_step, 4)
+
+        if rate <= 0 or rate == 1.0:
+            return base
+
+        key = (name, rate)
+        variant = self.variants.get(key)
+
+        if variant is None:
+            variant = self._resample(base, 1.0 / rate)
+            self.variants[key] = variant
+
+            if len(self.variants) > self.max_variants:
+                self.variants.popitem(last = False)
+
+        else:
+            self.variants.move_to_end(key)
+
+        return variant
+
+    # Playback - - - - - - - - - - - - - - - - - - - - - - - - -
+
+    def play(self, name, rate = 1.0, gain = 1.0):
+        triggered_at = time.perf_counter()
+
+        data = self._variant(name, rate)
+
+        # Queued before registering, so the mixer never drops the bank while a voice is waiting.
+        self._pending.append(Voice(data, gain, triggered_at))
+        mixer.register(self, transient = True, wait = False)
+
+        self._trigger_times.append(time.perf_counter() - triggered_at)
+
+    def render(self, block, frames, time_info, status):
+        start = time.perf_counter()
+
+        while self._pending:
+            self._voices.append(self._pending.popleft())
+
+            if len(self._voices) > self.max_voices:
+                self._voices.pop(0)
+                self._stolen += 1
+
+        if not self._voices:
+            return False
+
+        block.fill(0)
+        dac_delay = max(0.0, time_info.outputBufferDacTime - time_info.currentTime) if time_info.currentTime else 0.0
+
+        for voice in self._voices:
+            if not voice.started:
+                voice.started = True
+                self._latencies.append(start - voice.triggered_at + dac_delay)
+
+            chunk = voice.data[voice.position:voice.position + frames]
+            block[:len(chunk)] += chunk * voice.gain
+            voice.position += frames
+
+        self._voices = [voice for voice in self._voices if voice.position < len(voice.data)]
+        self._callback_times.append(time.perf_counter() - start)
+
+        return True
+
+    def idle(self):
+        return not self._pending and not self._voices
+
+    def get_metrics(self):
+        triggers = list(self._trigger_times)
+        latencies = list(self._latencies)
+        callbacks = list(self._callback_times)
+
+        return {
+            "sounds": len(self.sounds),
+            "variants": len(self.variants),
+            "active_voices": len(self._voices),
+            "stolen_voices": self._stolen,
+            "trigger_avg_us": sum(triggers) / len(triggers) * 1e6 if triggers else 0.0,
+            "trigger_max_us": max(triggers) * 1e6 if triggers else 0.0,
+            "latency_avg_ms": sum(latencies) / len(latencies) * 1000.0 if latencies else 0.0,
+            "latency_max_ms": max(latencies) * 1000.0 if latencies else 0.0,
+            "mix_avg_us": sum(callbacks) / len(callbacks) * 1e6 if callbacks else 0.0,
+            "mix_max_us": max(callbacks) * 1e6 if callbacks else 0.0
+        }
+
+bank = SoundBank()
@@ -0,0 +1,370 @@
+import math
+import time
+import heapq
+import bisect
+
+import numpy as np
+
+class TrackItems:
+    # One track's visualizer items: key lookups plus a start - ordered view. Edits never shift a list, removals leave
+    # their order entry behind and inserts are appended unsorted, both are folded in by the next ordered() or compaction.
+    def __init__(self, items = ()):
+        self._items = {}
+        self._entries = {}
+        self._order = []
+        self._pending = []
+        self._seq = 0
+
+        for key, item in dict(items).items():
+            self[key] = item
+
+    def __setitem__(self, key, item):
+        self._items[key] = item
+
+        # The sequence number keeps equal starts in insertion order and keys from ever being compared.
+        entry = (item["start"], self._seq, key)
+        self._seq += 1
+
+        self._entries[key] = entry
+        self._pending.append(entry)
+        self._maybe_compact()
+
+    def __getitem__(self, key):
+        return self._items[key]
+
+    def __contains__(self, key):
+        return key in self._items
+
+    def __len__(self):
+        return len(self._items)
+
+    def __iter__(self):
+        return iter(self._items)
+
+    def get(self, key, default = None):
+        return self._items.get(key, default)
+
+    def pop(self, key, *default):
+        if key not in self._items:
+            if default:
+                return default[0]
+
+            raise KeyError(key)
+
+        del self._entries[key]
+        item = self._items.pop(key)
+        self._maybe_compact()
+
+        return item
+
+    def keys(self):
+        return self._items.keys()
+
+    def values(self):
+        return self._items.values()
+
+    def items(self):
+        return self._items.items()
+
+    def _maybe_compact(self):
+        # Stale entries are dropped once they outnumber the live ones, which keeps every edit O(1) amortized.
+        if len(self._order) + len(self._pending) > 2 * len(self._entries) + 64:
+            self._compact()
+
+    def _compact(self):
+        self._pending.sort()
+        live = self._entries
+
+        self._order = [entry for entry in heapq.merge(self._order, self._pending) if live.get(entry[2]) is entry]
+        self._pending = []
+
+    def ordered(self):
+        if self._pending or len(self._order) != len(self._entries):
+            self._compact()
+
+        items = self._items
+        return [(key, items[key]) for _, _, key in self._order]
+
+class ScheduleIndex:
+    # Items sorted by start with a forward cursor, only the currently active ones are touched per frame.
+    def __init__(self, items, num_segs):
+        self.num_segs = num_segs
+
+        if isinstance(items, TrackItems):
+            entries = items.ordered()
+
+        else:
+            entries = sorted(items.items(), key = lambda entry: entry[1]["start"])
+
+        self.keys = [key for key, _ in entries]
+        self.starts = [item["start"] for _, item in entries]
+        self.ends = [item["start"] + item["duration"] for _, item in entries]
+        self.brightness = [(item["brightness"], item.get("end_brightness", item["brightness"])) for _, item in entries]
+        self.targets = [self._targets(item) for _, item in entries]
+        self.key_starts = dict(zip(self.keys, self.starts))
+
+        self.max_duration = max((end - start for start, end in zip(self.starts, self.ends)), default = 0)
+        self.end_ms = max(self.ends, default = 0)
+
+        self.cursor = 0
+        self.active = []
+        self.last_now = None
+
+    def __len__(self):
+        return len(self.starts)
+
+    def _targets(self, item):
+        targets = np.asarray(item.get("segments") or range(self.num_segs), dtype = np.intp)
+        return targets[(targets >= 0) & (targets < self.num_segs)]
+
+    def _find(self, key):
+        start = self.key_starts[key]
+        i = bisect.bisect_left(self.starts, start)
+
+        while self.keys[i] != key:
+            i += 1
+
+        return i
+
+    def remove(self, key):
+        if key not in self.key_starts:
+            return
+
+        i = self._find(key)
+        del self.key_starts[key]
+
+        for column in (self.keys, self.starts, self.ends, self.brightness, self.targets):
+            del column[i]
+
+        self.last_now = None
+
+    def upsert(self, key, item):
+        self.remove(key)
+
+        start = item["start"]
+        end = start + item["duration"]
+        i = bisect.bisect_right(self.starts, start)
+
+        self.keys.insert(i, key)
+        self.starts.insert(i, start)
+        self.ends.insert(i, end)
+        self.brightness.insert(i, (item["brightness"], item.get("end_brightness", item["brightness"])))
+        self.targets.insert(i, self._targets(item))
+        self.key_starts[key] = start
+
+        # Both bounds only grow, a stale larger value just widens the seek window.
+        self.max_duration = max(self.max_duration, end - start)
+        self.end_ms = max(self.end_ms, end)
+        self.last_now = None
+
+    def apply(self, upserts, removals):
+        for key in removals:
+            self.remove(key)
+
+        for key, item in upserts.items():
+            self.upsert(key, item)
+
+    def seek(self, now):
+        lo = bisect.bisect_left(self.starts, now - self.max_duration)
+        hi = bisect.bisect_right(self.starts, now)
+
+        self.active = [i for i in range(lo, hi) if self.ends[i] >= now]
+        self.cursor = hi
+        self.last_now = now
+
+    def advance(self, now):
+        if self.last_now is None or now < self.last_now or now - self.last_now > self.max_duration:
+            self.seek(now)
+            return
+
+        starts = self.starts
+        cursor = self.cursor
+        active = self.active
+
+        while cursor < len(starts) and starts[cursor] <= now:
+            active.append(cursor)
+            cursor += 1
+
+        self.cursor = cursor
+        self.active = [i for i in active if self.ends[i] >= now]
+        self.last_now = now
+
+    def next_event(self, now):
+        # Time of the next level change, now while something is lit, None once the schedule is over.
+        self.advance(now)
+
+        if self.active:
+            return now
+
+        return self.starts[self.cursor] if self.cursor < len(self.starts) else None
+
+    def brightness_at(self, i, now):
+        b_start, b_end = self.brightness[i]
+
+        if b_start == b_end:
+            return b_start
+
+        duration = self.ends[i] - self.starts[i]
+        progress = (now - self.starts[i]) / duration if duration > 0 else 0.0
+
+        return b_start + (b_end - b_start) * progress
+
+    def levels_at(self, now, out):
+        self.advance(now)
+        out.fill(0)
+
+        for i in self.active:
+            targets = self.targets[i]
+            out[targets] = np.maximum(out[targets], self.brightness_at(i, now))
+
+        return out
+
+class CompiledTimeline:
+    # Dense (frames, segments) brightness table sampled at the display rate, rebuilt only where items changed.
+    def __init__(self, num_segs, fps = 60):
+        self.num_segs = num_segs
+        self.frame_ms = 1000.0 / fps
+
+        self.table = np.zeros((0, num_segs), dtype = np.uint8)
+        self.signatures = {}
+        self.index = None
+
+        self.last_build_ms = 0.0
+        self.last_rows = 0
+
+    @property
+    def nbytes(self):
+        return self.table.nbytes
+
+    def _signature(self, item):
+        return (
+            item["start"],
+            item["duration"],
+            item["brightness"],
+            item.get("end_brightness", item["brightness"]),
+            tuple(item.get("segments") or ())
+        )
+
+    def _frame_span(self, start, end):
+        f0, f1 = math.ceil(start / self.frame_ms), math.floor(end / self.frame_ms)
+
+        # Items shorter than a frame that fall between frame times still light the frame they start in.
+        if f1 < f0:
+            f0 = f1 = math.floor(start / self.frame_ms)
+
+        return f0, f1
+
+    def rebuild(self, items, index):
+        signatures = {key: self._signature(item) for key, item in items.items()}
+        changed = [key for key in signatures.keys() | self.signatures.keys() if signatures.get(key) != self.signatures.get(key)]
+
+        self._update(index, signatures, changed)
+
+    def apply(self, index, upserts, removals):
+        signatures = dict(self.signatures)
+
+        for key in removals:
+            signatures.pop(key, None)
+
+        for key, item in upserts.items():
+            signatures[key] = self._signature(item)
+
+        self._update(index, signatures, list(removals) + list(upserts))
+
+    def _update(self, index, signatures, changed):
+        started = time.perf_counter()
+
+        ranges = []
+        for key in changed:
+            for signature in (self.signatures.get(key), signatures.get(key)):
+                if signature is not None:
+                    ranges.append(self._frame_span(signature[0], signature[0] + signature[1]))
+
+        frames = math.floor(index.end_ms / self.frame_ms) + 1 if len(index) else 0
+
+        if frames != self.table.shape[0]:
+            table = np.zeros((frames, self.num_segs), dtype = np.uint8)
+            keep = min(frames, self.table.shape[0])
+            table[:keep] = self.table[:keep]
+            self.table = table
+
+        self.index = index
+        self.signatures = signatures
+        self.last_rows = 0
+
+        for f_lo, f_hi in self._merge(ranges, frames):
+            self.table[f_lo:f_hi + 1] = 0
+            self.last_rows += f_hi - f_lo + 1
+
+            lo = bisect.bisect_left(index.starts, f_lo * self.frame_ms - index.max_duration)
+            hi = bisect.bisect_right(index.starts, (f_hi + 1) * self.frame_ms)
+
+            for i in range(lo, hi):
+                self._rasterize(i, f_lo, f_hi)
+
+        self.last_build_ms = (time.perf_counter() - started) * 1000.0
+
+    def _merge(self, ranges, frames):
+        merged = []
+
+        for f_lo, f_hi in sorted(ranges):
+            f_lo, f_hi = max(0, f_lo), min(frames - 1, f_hi)
+
+            if f_hi < f_lo:
+                continue
+
+            if merged and f_lo <= merged[-1][1] + 1:
+                merged[-1][1] = max(merged[-1][1], f_hi)
+
+            else:
+                merged.append([f_lo, f_hi])
+
+        return merged
+
+    def _rasterize(self, i, f_lo, f_hi):
+        index = self.index
+        start, end = index.starts[i], index.ends[i]
+
+        f0, f1 = self._frame_span(start, end)
+        f0, f1 = max(f0, f_lo), min(f1, f_hi)
+
+        if f1 < f0:
+            return
+
+        targets = index.targets[i]
+        targets = targets[targets < self.num_segs]
+
+        times = np.arange(f0, f1 + 1) * self.frame_ms
+        b_start, b_end = index.brightness[i]
+        duration = end - start
+
+        if b_start == b_end or duration <= 0:
+            values = np.full(len(times), b_start, dtype = np.float64)
+
+        else:
+            values = b_start + (b_end - b_start) * np.clip((times - start) / duration, 0.0, 1.0)
+
+        values = np.clip(np.rint(values), 0, 255).astype(np.uint8)
+
+        rows = self.table[f0:f1 + 1]
+        rows[:, targets] = np.maximum(rows[:, targets], values[:, None])
+
+    def frame_at(self, now):
+        return int(now / self.frame_ms)
+
+    def peak(self, f0, f1):
+        # Max over frames f0..f1, so items shorter than the sampling interval still show up.
+        f0, f1 = max(0, f0), min(f1, self.table.shape[0] - 1)
+
+        if f1 < f0:
+            return None
+
+        return self.table[f0:f1 + 1].max(axis = 0)
+
+    def row(self, now):
+        frame = int(now / self.frame_ms)
+
+        if frame < 0 or frame >= self.table.shape[0]:
+            return None
+
+        return self.table[frame]
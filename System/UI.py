@@ -17,69 +17,15 @@ from OpenGL.GL import shaders
 from . import Utils
 from . import Styles
 from . import Player
+from . import SoundBank
+from . import Timeline
+from . import Geometry
 from . import GlyphEffects
 from . import ExporterImporter
 
 from .Constants import *
 from loguru import logger
 
-def parse_svg_path_data(d_string: str) -> QPainterPath:
-    path = QPainterPath()
-    tokens = re.findall(r'([a-zA-Z]|-?[\d\.]+)', d_string)
-    
-    current_x = 0.0
-    current_y = 0.0
-    
-    i = 0
-    while i < len(tokens):
-        cmd = tokens[i]
-        
-        if not cmd[0].isalpha():
-            pass
-        
-        else:
-            i += 1
-        
-        if cmd == 'M':
-            x = float(tokens[i]); y = float(tokens[i+1])
-            path.moveTo(x, y)
-            current_x, current_y = x, y
-            i += 2
-        
-        elif cmd == 'L':
-            x = float(tokens[i]); y = float(tokens[i+1])
-            path.lineTo(x, y)
-            current_x, current_y = x, y
-            i += 2
-        
-        elif cmd == 'H':
-            x = float(tokens[i])
-            path.lineTo(x, current_y)
-            current_x = x
-            i += 1
-        
-        elif cmd == 'V':
-            y = float(tokens[i])
-            path.lineTo(current_x, y)
-            current_y = y
-            i += 1
-        
-        elif cmd == 'C':
-            c1x = float(tokens[i]);   c1y = float(tokens[i+1])
-            c2x = float(tokens[i+2]); c2y = float(tokens[i+3])
-            ex = float(tokens[i+4]);  ey = float(tokens[i+5])
-            path.cubicTo(c1x, c1y, c2x, c2y, ex, ey)
-            current_x, current_y = ex, ey
-            i += 6
-        
-        elif cmd == 'Z' or cmd == 'z':
-            path.closeSubpath()
-        
-        else:
-            pass
-            
-    return path
-
 def normalize_size(width, height, max_ref = 1500):
     return min(max(width, height) / max_ref, 1.0)
 
@@ -904,8 +850,13 @@ class EffectPreviewWidget(QWidget):
     
     def showEvent(self, event):
         super().showEvent(event)
+        self.reset_apply_button()
         self.live_preview_bar.play()
 
+    def reset_apply_button(self):
+        self.apply_button.setText("Apply")
+        self.apply_button.setStyleSheet(Styles.Buttons.nothing_styled_button)
+
     def hideEvent(self, event):
         super().hideEvent(event)
         self.live_preview_bar.stop()
@@ -1106,6 +1057,70 @@ class ValuePopup(QWidget):
         super().hide()
         self.deleteLater()
 
+class AudioStatsOverlay(QWidget):
+    def __init__(self, player, parent = None):
+        super().__init__(parent)
+
+        self.player = player
+        self.padding = 8
+
+        self.setAttribute(Qt.WA_TransparentForMouseEvents)
+
+        self.label = QLabel(self)
+        self.label.setFont(Utils.NType(10))
+        self.label.setStyleSheet("color: white; background: transparent;")
+        self.label.move(self.padding, self.padding)
+
+        self.refresh_timer = QTimer(self)
+        self.refresh_timer.timeout.connect(self.refresh)
+        self.refresh_timer.start(500)
+
+        self.hide()
+
+    def refresh(self):
+        if not CurrentSettings["audio_stats_overlay"]:
+            self.isVisible() and self.hide()
+            return
+
+        stats = self.player.get_audio_stats()
+        latency = stats["latency_ms"]
+        dsp = " ".join(f"{name} {node['avg_us']:.0f}us" for name, node in stats["dsp"].items() if node["calls"])
+
+        lines = [
+            f"Block {stats['blocksize']} @ {stats['samplerate']} Hz, budget {stats['budget_ms']:.2f} ms, latency {latency:.1f} ms" if latency is not None else f"Block {stats['blocksize']}, budget {stats['budget_ms']:.2f} ms",
+            f"Load avg {stats['avg_load'] * 100:.0f}%  peak {stats['peak_load'] * 100:.0f}%  max {stats['max_wall_ms']:.2f} ms",
+            f"Underflows {stats['underflows']}  overflows {stats['overflows']}  late {stats['late_blocks']}  lock {stats['max_lock_wait_ms']:.2f} ms",
+            "  ".join(f"{edge} {count}" for edge, count in stats["histogram"].items())
+        ]
+
+        if dsp:
+            lines.append(dsp)
+
+        sounds = SoundBank.bank.get_metrics()
+        lines.append(
+            f"UI sounds latency avg {sounds['latency_avg_ms']:.1f} ms  max {sounds['latency_max_ms']:.1f} ms  "
+            f"trigger {sounds['trigger_avg_us']:.0f}us  mix {sounds['mix_avg_us']:.0f}us  voices {sounds['active_voices']}  stolen {sounds['stolen_voices']}"
+        )
+
+        self.label.setText("\n".join(lines))
+        self.label.adjustSize()
+        self.resize(self.label.width() + self.padding * 2, self.label.height() + self.padding * 2)
+
+        parent = self.parentWidget()
+        if parent:
+            self.move(parent.width() - self.width() - 10, 10)
+
+        self.raise_()
+        self.isVisible() or self.show()
+
+    def paintEvent(self, event):
+        painter = QPainter(self)
+        CurrentSettings["antialiasing"] and painter.setRenderHint(QPainter.Antialiasing)
+
+        painter.setBrush(QColor(Styles.Colors.secondary_background))
+        painter.setPen(Qt.NoPen)
+        painter.drawRoundedRect(QRect(0, 0, self.width(), self.height()), 8, 8)
+
 class MiniWaveformPreview(QWidget):
     preview_clicked = pyqtSignal(float)
 
@@ -3437,6 +3452,30 @@ class Settings(FloatingWindowGPU):
         super().on_ok()
         self.save_settings()
 
+class LazySubmenu:
+    # Submenu whose entries are only built the first time it is shown.
+    def __init__(self, factory):
+        self.factory = factory
+
+class LentWidget:
+    # Menu entry for a widget its owner keeps after the menu closes, like the cached effect previews.
+    def __init__(self, widget):
+        self.widget = widget
+
+class LentWidgetAction(QWidgetAction):
+    # Menus borrow the widget and hand it back on close instead of deleting it, so callers can reuse it.
+    def __init__(self, widget, parent):
+        super().__init__(parent)
+        self._widget = widget
+
+    def createWidget(self, parent):
+        self._widget.setParent(parent)
+        return self._widget
+
+    def deleteWidget(self, widget):
+        widget.hide()
+        widget.setParent(None)
+
 class ContextMenu(QMenu):
     def __init__(self, entries):
         super().__init__()
@@ -3464,6 +3503,19 @@ class ContextMenu(QMenu):
                 
                 continue
 
+            if isinstance(handler, LazySubmenu):
+                sub = menu.addMenu(label)
+                self._style_menu(sub)
+                sub.aboutToShow.connect(lambda sub = sub, handler = handler: self._populate_lazy(sub, handler))
+
+                continue
+
+            if isinstance(handler, LentWidget):
+                wa = LentWidgetAction(handler.widget, menu)
+                menu.addAction(wa)
+                
+                continue
+
             if isinstance(handler, QWidget):
                 wa = QWidgetAction(menu)
                 wa.setDefaultWidget(handler)
@@ -3482,6 +3534,12 @@ class ContextMenu(QMenu):
             act.setEnabled(False)
             menu.addAction(act)
 
+    def _populate_lazy(self, menu: QMenu, submenu: LazySubmenu):
+        if menu.actions():
+            return
+
+        self._populate(menu, submenu.factory())
+
     def exec_and_cleanup(self, global_pos):
         try:
             self.exec(global_pos)
@@ -3610,56 +3668,83 @@ class ScheduledLogicMixin:
         self.segment_number = segment_number
         self._loop = loop
         self._schedule = []
-        self.levels = [0.0] * self.segment_number
+        self._index = None
+        self._compiled = Timeline.CompiledTimeline(segment_number)
+        self.levels = np.zeros(self.segment_number, dtype=np.uint8)
         
         self.start_offset = 0
+        self.base_interval = 23
         self.timer = QTimer()
-        self.timer.setInterval(23)
+        self.timer.setInterval(self.base_interval)
         self.timer.timeout.connect(self._tick)
         self.elapsed_timer = QElapsedTimer()
         self.duration_ms = 0
+        self._next_frame = 0
 
     def set_schedule(self, schedule):
+        # Previews loop a fixed schedule, so the whole loop is rasterized once into a (frames, segments) table.
+        items = dict(enumerate(schedule))
+
         self._schedule = schedule
-        self.duration_ms = max((x["start"] + x["duration"] for x in schedule), default=0)
+        self._index = Timeline.ScheduleIndex(items, self.segment_number)
+        self._compiled.rebuild(items, self._index)
+        self.duration_ms = self._index.end_ms
 
     def play(self, start_offset_ms: int = 0):
         self.start_offset = start_offset_ms
+        self._next_frame = self._compiled.frame_at(start_offset_ms)
         self.elapsed_timer.start()
+        self.timer.setInterval(self.base_interval)
         self.timer.start()
 
+    def _sleep(self, now):
+        # Nothing lit: wait for the next item or the loop end instead of ticking through the gap.
+        wake_at = self._index.next_event(now) if self._index is not None else None
+        delay = int((self.duration_ms if wake_at is None else wake_at) - now) - self.base_interval
+
+        self.timer.setInterval(max(self.base_interval, delay))
+
     def stop(self, clear_levels: bool = True):
         self.timer.stop()
         if clear_levels:
-            self.levels = [0.0] * self.segment_number
+            self.levels = np.zeros(self.segment_number, dtype=np.uint8)
+            if hasattr(self, 'update'): self.update()
+
+    def _peak_until(self, now):
+        # Every frame since the last tick counts, a flash shorter than the tick interval is not skipped.
+        frame = self._compiled.frame_at(now)
+        levels = self._compiled.peak(min(self._next_frame, frame), frame)
+        self._next_frame = frame + 1
+
+        if levels is None:
+            levels = np.zeros(self.segment_number, dtype=np.uint8)
+
+        return levels
+
+    def _show(self, new_levels):
+        if not np.array_equal(new_levels, self.levels):
+            self.levels = new_levels
             if hasattr(self, 'update'): self.update()
 
     def _tick(self):
         now = self.elapsed_timer.elapsed() + self.start_offset
         if self.duration_ms and now > self.duration_ms:
             if self._loop:
+                self._show(self._peak_until(self.duration_ms))
                 self.play()
                 return
             self.stop()
             return
 
-        new_levels = [0.0] * self.segment_number
-        for item in self._schedule:
-            t_start, dur = item["start"], item["duration"]
-            if not (t_start <= now <= t_start + dur): continue
-
-            progress = (now - t_start) / dur
-            b_start, b_end = item["brightness"], item.get("end_brightness", item["brightness"])
-            val = b_start + (b_end - b_start) * progress
+        new_levels = self._peak_until(now)
+        self._show(new_levels)
 
-            indices = item.get("segments") or range(self.segment_number)
-            for i in indices:
-                if 0 <= i < self.segment_number:
-                    new_levels[i] = max(new_levels[i], val)
+        if new_levels.any():
+            if self.timer.interval() != self.base_interval:
+                self.timer.setInterval(self.base_interval)
 
-        if new_levels != self.levels:
-            self.levels = new_levels
-            if hasattr(self, 'update'): self.update()
+        else:
+            self._sleep(now)
 
 class ScheduledSegmentedBar(QWidget, ScheduledLogicMixin):
     def __init__(self, segment_number=30, base_thickness=20, loop=False):
@@ -3668,29 +3753,49 @@ class ScheduledSegmentedBar(QWidget, ScheduledLogicMixin):
         self.setFixedHeight(base_thickness)
         self.colors = (QColor("#404040"), QColor("#ffffff")) # Off/On
 
+        self._gradients = {}
+        self.max_cached_gradients = 128
+
+    def _gradient(self, levels):
+        # Levels are already whole brightness steps, so equal frames share one gradient.
+        key = levels.tobytes()
+        grad = self._gradients.get(key)
+
+        if grad is not None:
+            return grad
+
+        if len(self._gradients) >= self.max_cached_gradients:
+            self._gradients.clear()
+
+        c_off, c_on = self.colors
+        off = np.array([c_off.red(), c_off.green(), c_off.blue()], dtype=np.float32)
+        on = np.array([c_on.red(), c_on.green(), c_on.blue()], dtype=np.float32)
+
+        t = np.clip(levels / 100.0, 0.0, 1.0)[:, None]
+        rgb = (off + (on - off) * t).astype(np.int32)
+        stops = np.arange(len(levels)) / max(1, self.segment_number - 1)
+
+        grad = QLinearGradient(0, 0, 1, 0)
+        grad.setCoordinateMode(QGradient.ObjectBoundingMode)
+
+        for stop, (red, green, blue) in zip(stops.tolist(), rgb.tolist()):
+            grad.setColorAt(stop, QColor(red, green, blue))
+
+        self._gradients[key] = grad
+        return grad
+
     def paintEvent(self, event):
         painter = QPainter(self)
         painter.setRenderHint(QPainter.Antialiasing)
         painter.setPen(Qt.NoPen)
-        
-        grad = QLinearGradient(0, 0, self.width(), 0)
-        c_off, c_on = self.colors
-        
-        for i, level in enumerate(self.levels):
-            t = np.clip(level / 100.0, 0.0, 1.0)
-            col = QColor(
-                int(c_off.red() + (c_on.red() - c_off.red()) * t),
-                int(c_off.green() + (c_on.green() - c_off.green()) * t),
-                int(c_off.blue() + (c_on.blue() - c_off.blue()) * t)
-            )
-            grad.setColorAt(i / max(1, self.segment_number - 1), col)
 
-        painter.setBrush(grad)
+        painter.setBrush(self._gradient(self.levels))
         r = self.height() / 2
         painter.drawRoundedRect(self.rect(), r, r)
 
 class GlyphVisualizer(FloatingWindowGPU):
     def __init__(self, model, player = None, bpm = None):
+        self.model = model
         self.map_data = ModelVisualizerMaps[model]
         self.map_w, self.map_h = self.map_data["size"]
         
@@ -3704,17 +3809,15 @@ class GlyphVisualizer(FloatingWindowGPU):
         self.resize_timer.timeout.connect(self._sync_size_delayed)
 
         self.glyphs_gpu = []
-        self._scratch_levels = np.zeros(128, dtype=np.float32)
+        self._scratch_levels = np.zeros(GLYPH_MAX_SEGMENTS, dtype=np.float32)
+        self._levels_dirty = True
 
         self.timer = QTimer()
-        self.elapsed = QElapsedTimer()
-        
-        self.timer.setInterval(16) 
+        self.timer.setInterval(FPS_60) 
         self.timer.timeout.connect(self._process_schedule)
         
         self.offset_ms = 0
-        self.virtual_time = 0
-        self.last_process_time = 0
+        self.running = False
 
         super().__init__(
             None,
@@ -3725,6 +3828,9 @@ class GlyphVisualizer(FloatingWindowGPU):
             open_animation_enabled = False,
             close_animation_enabled = False
         )
+
+        if hasattr(self.player, "speed_changed"):
+            self.player.speed_changed.connect(self.wake)
         
         self.scale_in()
         self._init_geometry()
@@ -3760,79 +3866,33 @@ class GlyphVisualizer(FloatingWindowGPU):
         self.scale_animation.start()
     
     def _init_geometry(self):
-        for gid, data in self.map_data["glyphs"].items():
-            glyph_gpu_data = self._process_single_glyph(gid, data)
-            self.glyphs_gpu.append(glyph_gpu_data)
-
-    def _process_single_glyph(self, gid, data):
-        pts_per_seg = 20
-        path = parse_svg_path_data(data["svg"])
-        num_segs = data.get("segments", 1)
-        px, py = data["position"]
-        verts, starts, counts = [], [], []
-        cur_offset = 0
-
-        for s in range(num_segs):
-            seg_points = self._generate_segment_points(path, s, num_segs, pts_per_seg, px, py)
-            seg_verts = self._calculate_segment_geometry(seg_points, s)
-            verts.extend(seg_verts)
-            num_verts = len(seg_verts) // 5
-            starts.append(cur_offset)
-            counts.append(num_verts)
-            cur_offset += num_verts
-
-        return {
-            "id": gid,
-            "vbo_data": np.array(verts, dtype=np.float32),
-            "starts": np.array(starts, dtype=np.int32),
-            "counts": np.array(counts, dtype=np.int32),
-            "num_segs": num_segs,
-            "levels": np.zeros(128, dtype=np.float32),
-            "schedule": [],
-            "schedule_active": [] 
-        }
-
-    def _generate_segment_points(self, path, s, num_segs, pts_per_seg, px, py):
-        start_t, end_t = s / num_segs, (s + 1) / num_segs
-        points = []
-        
-        for i in range(pts_per_seg):
-            t = start_t + (i / (pts_per_seg - 1)) * (end_t - start_t)
-            pt = path.pointAtPercent(t)
-            
-            points.append(
-                np.array(
-                    [
-                        pt.x() + px - self.map_w/2, 
-                        -(pt.y() + py) + self.map_h/2
-                    ]
-                )
+        geometry = Geometry.load_model_geometry(self.model, self.map_data)
+
+        self.vbo_data = geometry["vbo_data"]
+        self.draw_starts = geometry["starts"]
+        self.draw_counts = geometry["counts"]
+
+        total_segs = int(geometry["seg_counts"].sum())
+        self.levels = np.zeros(max(4, -(-total_segs // 4) * 4), dtype=np.float32)
+
+        seg_offset = 0
+        for gid, num_segs in zip(geometry["ids"], geometry["seg_counts"]):
+            num_segs = int(num_segs)
+
+            # Each glyph's levels are a view into the shared block uploaded to the shader.
+            self.glyphs_gpu.append(
+                {
+                    "id": str(gid),
+                    "num_segs": num_segs,
+                    "levels": self.levels[seg_offset:seg_offset + num_segs],
+                    "index": None,
+                    "compiled": None
+                }
             )
-        
-        return points
 
-    def _calculate_segment_geometry(self, points, seg_index):
-        seg_verts = []
-        
-        for i, p in enumerate(points):
-            if i < len(points) - 1:
-                tangent = points[i+1] - p
-            
-            else:
-                tangent = p - points[i-1]
-            
-            length = np.linalg.norm(tangent)
-            norm = np.array([-tangent[1], tangent[0]]) / (length if length != 0 else 1)
-            idx_f = float(seg_index)
-            
-            seg_verts.extend(
-                (
-                    p[0], p[1], norm[0], norm[1], idx_f,
-                    p[0], p[1], -norm[0], -norm[1], idx_f
-                )
-            )
-        
-        return seg_verts
+            seg_offset += num_segs
+
+        self.glyphs_by_id = {g["id"]: g for g in self.glyphs_gpu}
 
     def initializeGL(self):
         super().initializeGL()
@@ -3850,19 +3910,26 @@ class GlyphVisualizer(FloatingWindowGPU):
         self.loc_thickness = glGetUniformLocation(self.prog, "uThickness")
         self.loc_color_on = glGetUniformLocation(self.prog, "uColorOn")
         self.loc_color_off = glGetUniformLocation(self.prog, "uColorOff")
-        self.loc_levels = glGetUniformLocation(self.prog, "uLevels")
 
-        for g in self.glyphs_gpu:
-            g["vao"], g["vbo"] = glGenVertexArrays(1), glGenBuffers(1)
-            glBindVertexArray(g["vao"])
-            glBindBuffer(GL_ARRAY_BUFFER, g["vbo"])
-            glBufferData(GL_ARRAY_BUFFER, g["vbo_data"].nbytes, g["vbo_data"], GL_STATIC_DRAW)
-            
-            stride = 20
-            glVertexAttribPointer(0, 2, GL_FLOAT, GL_FALSE, stride, ctypes.c_void_p(0))
-            glVertexAttribPointer(1, 2, GL_FLOAT, GL_FALSE, stride, ctypes.c_void_p(8))
-            glVertexAttribPointer(2, 1, GL_FLOAT, GL_FALSE, stride, ctypes.c_void_p(16))
-            glEnableVertexAttribArray(0); glEnableVertexAttribArray(1); glEnableVertexAttribArray(2)
+        self.vao, self.vbo = glGenVertexArrays(1), glGenBuffers(1)
+        glBindVertexArray(self.vao)
+        glBindBuffer(GL_ARRAY_BUFFER, self.vbo)
+        glBufferData(GL_ARRAY_BUFFER, self.vbo_data.nbytes, self.vbo_data, GL_STATIC_DRAW)
+        
+        stride = 20
+        glVertexAttribPointer(0, 2, GL_FLOAT, GL_FALSE, stride, ctypes.c_void_p(0))
+        glVertexAttribPointer(1, 2, GL_FLOAT, GL_FALSE, stride, ctypes.c_void_p(8))
+        glVertexAttribPointer(2, 1, GL_FLOAT, GL_FALSE, stride, ctypes.c_void_p(16))
+        glEnableVertexAttribArray(0); glEnableVertexAttribArray(1); glEnableVertexAttribArray(2)
+        glBindVertexArray(0)
+
+        self.levels_ubo = glGenBuffers(1)
+        glBindBuffer(GL_UNIFORM_BUFFER, self.levels_ubo)
+        glBufferData(GL_UNIFORM_BUFFER, GLYPH_MAX_SEGMENTS * 4, None, GL_DYNAMIC_DRAW)
+        glBindBuffer(GL_UNIFORM_BUFFER, 0)
+
+        glUniformBlockBinding(self.prog, glGetUniformBlockIndex(self.prog, "Levels"), 0)
+        self._levels_dirty = True
 
     def paintGL(self):
         super().paintGL() 
@@ -3887,85 +3954,131 @@ class GlyphVisualizer(FloatingWindowGPU):
         glUniform3f(self.loc_color_on, 1.0, 1.0, 1.0)
         glUniform3f(self.loc_color_off, 0.2, 0.2, 0.2)
 
-        for g in self.glyphs_gpu:
-            if g["counts"].size == 0: continue
+        glBindBufferBase(GL_UNIFORM_BUFFER, 0, self.levels_ubo)
+
+        if self._levels_dirty:
+            glBindBuffer(GL_UNIFORM_BUFFER, self.levels_ubo)
+            glBufferSubData(GL_UNIFORM_BUFFER, 0, self.levels.nbytes, self.levels)
+            glBindBuffer(GL_UNIFORM_BUFFER, 0)
+            self._levels_dirty = False
 
-            glBindVertexArray(g["vao"])
-            glUniform1fv(self.loc_levels, 128, g["levels"])
-            glMultiDrawArrays(GL_TRIANGLE_STRIP, g["starts"], g["counts"], len(g["starts"]))
+        if self.draw_counts.size:
+            glBindVertexArray(self.vao)
+            glMultiDrawArrays(GL_TRIANGLE_STRIP, self.draw_starts, self.draw_counts, len(self.draw_starts))
 
         glBindVertexArray(0)
         glUseProgram(0)
 
     def set_schedule(self, schedule_dict):
+        compile_timeline = CurrentSettings["compiled_timeline"]
+        build_ms, rows, memory = 0.0, 0, 0
+
         for g in self.glyphs_gpu:
-            raw_schedule = list(schedule_dict.get(g["id"], {}).values())
-            
-            for item in raw_schedule:
-                item["_targets"] = item.get("segments") or list(range(g["num_segs"]))
-            
-            g["schedule"] = raw_schedule
+            items = schedule_dict.get(g["id"], {})
+            g["index"] = Timeline.ScheduleIndex(items, g["num_segs"])
+
+            if not compile_timeline:
+                g["compiled"] = None
+                continue
+
+            if g["compiled"] is None:
+                g["compiled"] = Timeline.CompiledTimeline(g["num_segs"])
+
+            g["compiled"].rebuild(items, g["index"])
+
+            build_ms += g["compiled"].last_build_ms
+            rows += g["compiled"].last_rows
+            memory += g["compiled"].nbytes
+
+        if compile_timeline:
+            logger.debug(f"Compiled glyph timeline: {rows} rows rebuilt in {build_ms:.1f} ms, {memory / 1024:.1f} KiB total")
+
+    def apply_schedule_changes(self, track, upserts, removals):
+        g = self.glyphs_by_id.get(str(track))
+
+        if g is None:
+            return
+
+        if g["index"] is None:
+            g["index"] = Timeline.ScheduleIndex({}, g["num_segs"])
+
+        g["index"].apply(upserts, removals)
+
+        if g["compiled"] is not None:
+            g["compiled"].apply(g["index"], upserts, removals)
+
+        self.wake()
 
     def play_all(self, ms_start=0):
         self.offset_ms = ms_start
-        self.virtual_time = ms_start
-        self.last_process_time = 0
-        
-        self.elapsed.start()
-        self.timer.start()
+        self.running = True
+        self.wake()
 
-    def stop_all(self):
-        self.timer.stop()
-        for g in self.glyphs_gpu: 
-            g["levels"].fill(0)
-        
-        self.update()
+    def wake(self, *args):
+        if self.running:
+            self.timer.setInterval(FPS_60)
+            self.timer.start()
+
+    def _sleep_until(self, now, next_event):
+        if next_event is None:
+            self.timer.stop()
+            return
 
-    def _calculate_brightness(self, item, now):
-        start = item["start"]
-        duration = item["duration"]
-        prog = (now - start) / duration
+        speed = max(abs(getattr(self.player, "speed", 1.0)), 0.05)
+        delay = (next_event - now) / speed - FPS_60
 
-        b_start = item["brightness"]
-        b_end = item.get("end_brightness", b_start)
+        self.timer.setInterval(int(delay) if delay > FPS_60 else FPS_60)
 
-        if b_start == b_end:
-            return b_start
+    def stop_all(self):
+        self.running = False
+        self.timer.stop()
+        self.levels.fill(0)
+        self._levels_dirty = True
         
-        return b_start + (b_end - b_start) * prog
+        self.update()
 
     def _process_schedule(self):
-        real_elapsed = self.elapsed.elapsed()
-        dt = real_elapsed - self.last_process_time
-
-        self.last_process_time = real_elapsed
-        self.virtual_time += dt * self.player.speed
-
-        now = self.virtual_time
+        now = self.player.get_position_ms()
         needs_update = False
-        scratch = self._scratch_levels
+        next_event = None
 
         for g in self.glyphs_gpu:
-            scratch.fill(0)
+            scratch = self._scratch_levels[:g["num_segs"]]
 
-            for item in g["schedule"]:
-                if not (item["start"] <= now <= item["start"] + item["duration"]):
-                    continue
-                
-                bright = self._calculate_brightness(item, now)
+            if g["index"] is not None:
+                glyph_event = g["index"].next_event(now)
+
+                if glyph_event is not None:
+                    next_event = glyph_event if next_event is None else min(next_event, glyph_event)
 
-                targets = np.array(item["_targets"])
-                valid_targets = targets[targets < 128]
+            if g["compiled"] is not None:
+                row = g["compiled"].row(now)
+                scratch.fill(0)
 
-                scratch[valid_targets] = np.maximum(scratch[valid_targets], bright)
+                if row is not None:
+                    scratch[:len(row)] = row
+
+            elif g["index"] is not None:
+                g["index"].levels_at(now, scratch)
+
+            else:
+                continue
 
             if not np.array_equal(g["levels"], scratch):
                 np.copyto(g["levels"], scratch)
                 needs_update = True
         
         if needs_update:
+            self._levels_dirty = True
             self.update()
 
+        # Everything is dark: sleep until the next item starts, speed changes, edits and seeks wake the timer.
+        if next_event != now and not self.levels.any():
+            self._sleep_until(now, next_event)
+
+        elif self.timer.interval() != FPS_60:
+            self.timer.setInterval(FPS_60)
+
     def wheelEvent(self, event):
         delta = 0.05 if event.angleDelta().y() > 0 else -0.05
         self.target_scale = min(max(0.3, self.target_scale + delta), 4)
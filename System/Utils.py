@@ -1,7 +1,6 @@
 import os
 import sys
 import time
-import pygame
 import random
 import shutil
 import requests
@@ -15,6 +14,7 @@ from PyQt5.QtWidgets import *
 import numpy as np
 
 from System.Constants import *
+from System import SoundBank
 
 def get_fox_image(url="https://randomfox.ca/floof/"):
     try:
@@ -153,6 +153,15 @@ def get_songs_path(relative_path: str) -> str:
     os.makedirs(os.path.dirname(full_path), exist_ok=True)
     return full_path
 
+def get_cache_path(relative_path: str) -> str:
+    # Kept outside ~/Songs, the project scanner deletes any folder there that isn't a project.
+    base = QStandardPaths.writableLocation(QStandardPaths.GenericCacheLocation) or os.path.join(os.path.expanduser("~"), ".cache")
+    normalized_parts = os.path.normpath(relative_path).split(os.sep)
+    full_path = os.path.join(base, "Cassette", *normalized_parts)
+    
+    os.makedirs(os.path.dirname(full_path), exist_ok=True)
+    return full_path
+
 def run(*args, **kwargs):
     if os.name == "nt":
         kwargs.setdefault("creationflags", subprocess.CREATE_NO_WINDOW)
@@ -164,40 +173,15 @@ def ui_sound(name, tone=None):
         if CurrentSettings["disable_sounds"]:
             return
 
-        if not pygame.mixer.get_init():
-            pygame.mixer.init()
-
-        sound = pygame.mixer.Sound(f"System/Sounds/{name}.wav")
-        array = pygame.sndarray.array(sound)
-
         rate = np.random.uniform(0.97, 1.03)
         
         if tone:
             rate = tone
 
         if tone == 1 or not CurrentSettings["sound_tone_effects"]:
-            sound.play()
-            return
-
-        if array.ndim == 1:
-            array_resample = array
-        
-        else:
-            array_resample = array.mean(axis=1)
-
-        new_length = int(len(array_resample) / rate)
-        
-        resampled = np.interp(
-            np.linspace(0, len(array_resample), new_length),
-            np.arange(len(array_resample)),
-            array_resample
-        ).astype(np.int16)
-
-        mixer_channels = pygame.mixer.get_init()[2]
-        resampled_multi = np.repeat(resampled[:, None], mixer_channels, axis=1)
+            rate = 1.0
 
-        new_sound = pygame.sndarray.make_sound(np.ascontiguousarray(resampled_multi))
-        new_sound.play()
+        SoundBank.bank.play(name, rate)
 
     except Exception as e:
         print(str(e))